@@ -1,8 +1,25 @@
-import joblib
 import pandas as pd
 import numpy as np
+from Classification.model_backends import load_model, batch_model as make_batch_model
+from config import *
 
-model = joblib.load("Classification/classification_model.pkl")
+# RandomForest or LightGBM, see CLASSIFICATION_MODEL
+model = load_model(CLASSIFICATION_MODEL)
+
+# Flattened copy of a forest, or the Booster of a LightGBM model, for batch inference
+batch_model = make_batch_model(model, USE_FLAT_FOREST)
+
+FEATURES = ['range', 'velocity', 'azimuth']
+
+# An sklearn model used directly (USE_FLAT_FOREST off) that was fitted on a DataFrame warns about
+# plain arrays, it gets the named columns it was fitted with. FlatForest and Booster take arrays.
+BATCH_MODEL_NEEDS_DATAFRAME = hasattr(batch_model, "feature_names_in_")
+
+# Classes reported under a different name downstream
+LABEL_REMAP = {
+    "uav": "others",
+    "bicycle": "person",
+}
 
 def classification_pipeline(range,velocity,azimuth):
     new_data = pd.DataFrame({
@@ -15,5 +32,42 @@ def classification_pipeline(range,velocity,azimuth):
     
     return predictions[0]
 
+def remap_labels(labels):
+    """Apply LABEL_REMAP to an array of predicted labels"""
+    labels = np.asarray(labels, dtype=object)
+    for source, target in LABEL_REMAP.items():
+        labels[labels == source] = target
+    return labels
+
+def classification_pipeline_batch(ranges, velocities, azimuths, use_pandas=False):
+    """
+    Classify all targets of a frame with a single predict call
+
+    Args:
+        ranges, velocities, azimuths: Equal length sequences, one entry per target
+        use_pandas: Pass a DataFrame with named columns to the model instead of a plain array,
+            always done for a model fitted on a DataFrame
+
+    Returns:
+        Object array of remapped class labels
+    """
+    features = np.column_stack((
+        np.asarray(ranges, dtype=np.float64),
+        np.asarray(velocities, dtype=np.float64),
+        np.asarray(azimuths, dtype=np.float64),
+    ))
+
+    if len(features) == 0:
+        return np.empty(0, dtype=object)
+
+    if use_pandas or BATCH_MODEL_NEEDS_DATAFRAME:
+        features = pd.DataFrame(features, columns=FEATURES)
+
+    predictions = batch_model.predict(features)
+
+    return remap_labels(predictions)
+
 if __name__ == "__main__":
+    # Run from the repository root: python -m Classification.CLASSIFICATION_PIPELINE
     print(classification_pipeline(123,50, 12))
+    print(classification_pipeline_batch([123, 20], [50, 1.5], [12, -30]))
@@ -0,0 +1,194 @@
+import json
+import math
+import os
+import time
+import joblib
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import ParameterGrid, StratifiedKFold
+
+
+def _fit_and_score(estimator, x, y, train, test):
+    estimator.fit(x.iloc[train], y.iloc[train])
+    return accuracy_score(y.iloc[test], estimator.predict(x.iloc[test]))
+
+
+def _params_key(params):
+    return json.dumps(params, sort_keys=True)
+
+
+class SearchCache:
+    def __init__(self, filename, fingerprint):
+        """
+        Fold splits, candidates and fold scores of a search, saved after every candidate
+
+        The cache is discarded when the data or the search settings (fingerprint) changed.
+        """
+        self.filename = filename
+        self.fingerprint = fingerprint
+        self.folds = None
+        self.candidates = None
+        self.scores = {}  # (params key, n_samples, fold) -> accuracy
+
+        if filename and os.path.exists(filename):
+            cached = joblib.load(filename)
+            if cached['fingerprint'] == fingerprint:
+                self.folds = cached['folds']
+                self.candidates = cached['candidates']
+                self.scores = cached['scores']
+                print(f"Resuming search from {filename}: {len(self.scores)} fits cached")
+            else:
+                print(f"Data or search settings changed, ignoring {filename}")
+
+    def save(self):
+        if not self.filename:
+            return
+        # Written next to the cache and renamed, an interrupted save keeps the previous cache
+        temporary = self.filename + ".tmp"
+        joblib.dump({
+            'fingerprint': self.fingerprint,
+            'folds': self.folds,
+            'candidates': self.candidates,
+            'scores': self.scores,
+        }, temporary)
+        os.replace(temporary, self.filename)
+
+
+def budgeted_search(estimator, param_grid, x_train, y_train, search="halving", n_candidates=None, factor=3,
+                    min_samples=None, cv=5, max_fits=None, max_time=None, cache_file=None, n_jobs=-1, random_state=42):
+    """
+    Randomized or successive-halving hyperparameter search within a fit and wall time budget
+
+    "random" scores n_candidates random parameter sets from param_grid on all training samples.
+    "halving" starts n_candidates sets on min_samples samples per fold, keeps the best 1/factor
+    of them and multiplies the samples by factor each round, until the last round uses all of them.
+
+    Args:
+        estimator, param_grid: As for GridSearchCV
+        x_train, y_train: Training DataFrame and label Series (already shuffled)
+        search: "halving" or "random"
+        n_candidates: Parameter sets to start with, defaults to one per last-round survivor
+            (halving) or 60 (random), at most the size of the grid
+        factor: Halving rate
+        min_samples: Training samples per fold in the first halving round
+        cv: Number of stratified folds
+        max_fits, max_time: Budget of new fits and seconds (None for no limit). When it runs out,
+            the best candidate of the furthest round is returned and a rerun with the same
+            cache_file continues where this one stopped.
+        cache_file: File keeping folds and scores between runs (None disables caching)
+        n_jobs: Folds fitted in parallel
+
+    Returns:
+        Best parameters and a report dict (fits, wall time, rounds)
+    """
+    if search not in ("halving", "random"):
+        raise ValueError(f"Unknown search: {search}")
+    start = time.monotonic()
+    grid = list(ParameterGrid(param_grid))
+
+    fingerprint = {
+        'data': joblib.hash((x_train, y_train)),
+        'estimator': repr(estimator),
+        'param_grid': _params_key(param_grid),
+        'settings': (search, n_candidates, factor, min_samples, cv, random_state),
+    }
+    cache = SearchCache(cache_file, fingerprint)
+
+    if cache.folds is None:
+        splitter = StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state)
+        cache.folds = list(splitter.split(x_train, y_train))
+    n_max = min(len(train) for train, _ in cache.folds)
+
+    # Number of samples per round
+    if search == "halving":
+        min_samples = min_samples or max(20 * y_train.nunique(), 100)
+        n_rounds = max(1 + int(math.floor(math.log(n_max / min_samples, factor))), 1) if n_max > min_samples else 1
+        round_samples = [min(min_samples * factor ** i, n_max) for i in range(n_rounds - 1)] + [n_max]
+        default_candidates = factor ** (n_rounds - 1)
+    else:
+        round_samples = [n_max]
+        default_candidates = 60
+
+    if cache.candidates is None:
+        n_candidates = min(n_candidates or default_candidates, len(grid))
+        rng = np.random.default_rng(random_state)
+        cache.candidates = [grid[i] for i in rng.choice(len(grid), n_candidates, replace=False)]
+        cache.save()
+
+    fits_run = 0
+    fits_cached = 0
+    budget_exhausted = False
+    rounds = []
+    candidates = cache.candidates
+    best_params = None
+
+    for round_number, n_samples in enumerate(round_samples):
+        round_scores = {}
+        for params in candidates:
+            key = _params_key(params)
+            missing = [fold for fold in range(cv) if (key, n_samples, fold) not in cache.scores]
+            fits_cached += cv - len(missing)
+
+            if missing:
+                if (max_fits is not None and fits_run + len(missing) > max_fits) or \
+                        (max_time is not None and time.monotonic() - start > max_time):
+                    budget_exhausted = True
+                    break
+                scores = Parallel(n_jobs=n_jobs)(
+                    delayed(_fit_and_score)(clone(estimator).set_params(**params), x_train, y_train,
+                                            cache.folds[fold][0][:n_samples], cache.folds[fold][1])
+                    for fold in missing
+                )
+                for fold, score in zip(missing, scores):
+                    cache.scores[(key, n_samples, fold)] = score
+                fits_run += len(missing)
+                cache.save()
+
+            round_scores[key] = (float(np.mean([cache.scores[(key, n_samples, fold)] for fold in range(cv)])), params)
+
+        if round_scores:
+            ranked = sorted(round_scores.values(), key=lambda item: -item[0])
+            best_params = ranked[0][1]
+            rounds.append({
+                'round': round_number,
+                'candidates': len(candidates),
+                'scored': len(round_scores),
+                'samples': n_samples,
+                'best_accuracy': round(ranked[0][0], 4),
+                'best_params': best_params,
+            })
+        if budget_exhausted:
+            break
+        # Survivors of this round, best first
+        candidates = [params for _, params in ranked[:max(int(math.ceil(len(candidates) / factor)), 1)]]
+
+    if best_params is None:
+        raise RuntimeError("Search budget too small to score a single candidate, increase max_fits or max_time")
+
+    elapsed = time.monotonic() - start
+    return best_params, {
+        'search': search,
+        'candidates': len(cache.candidates),
+        'fits_run': fits_run,
+        'fits_cached': fits_cached,
+        'wall_time_s': round(elapsed, 1),
+        'seconds_per_fit': round(elapsed / fits_run, 3) if fits_run else None,
+        'budget_exhausted': budget_exhausted,
+        'rounds': rounds,
+    }
+
+
+def print_report(report):
+    print(f"\nSearch: {report['search']}, {report['candidates']} candidates")
+    print(f"{'Round':<6} {'Candidates':<11} {'Scored':<7} {'Samples':<8} {'Best accuracy':<14}")
+    print("-" * 50)
+    for search_round in report['rounds']:
+        print(f"{search_round['round']:<6} {search_round['candidates']:<11} {search_round['scored']:<7} "
+              f"{search_round['samples']:<8} {search_round['best_accuracy']:<14}")
+    print("-" * 50)
+    per_fit = f" ({report['seconds_per_fit']} s per fit)" if report['fits_run'] else ""
+    print(f"Fits: {report['fits_run']} run, {report['fits_cached']} from cache, wall time {report['wall_time_s']} s{per_fit}")
+    if report['budget_exhausted']:
+        print("Budget exhausted before the search finished, rerun with the same cache file to continue")
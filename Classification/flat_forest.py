@@ -0,0 +1,162 @@
+import joblib
+import numpy as np
+import time
+
+class FlatForest:
+    """
+    Fitted sklearn forest flattened into NumPy node arrays
+
+    All trees are stored back to back in one set of arrays and leaves point to
+    themselves. A whole batch is walked through every tree at once, one tree
+    level per step, without per-node Python work.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, classes, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = max_depth
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        """Build from a fitted RandomForestClassifier (or any single output forest classifier)"""
+        if getattr(forest, "n_outputs_", 1) != 1:
+            raise ValueError("Only single output forests are supported")
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count, dtype=np.intp) + offset
+            is_leaf = tree.children_left == -1
+
+            # Leaves loop back onto themselves
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+            thresholds.append(tree.threshold.astype(np.float64))
+
+            # Same normalisation as DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts).astype(np.intp),
+            right=np.concatenate(rights).astype(np.intp),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            classes=np.asarray(forest.classes_),
+            max_depth=max_depth,
+        )
+
+    @classmethod
+    def load(cls, filename):
+        """Load a forest saved with save()"""
+        with np.load(filename) as data:
+            return cls(
+                feature=data["feature"],
+                threshold=data["threshold"],
+                left=data["left"],
+                right=data["right"],
+                value=data["value"],
+                roots=data["roots"],
+                classes=data["classes"],
+                max_depth=int(data["max_depth"]),
+            )
+
+    def save(self, filename):
+        """Save the node arrays as .npz (no pickle needed to load them back)"""
+        classes = self.classes_.astype(str) if self.classes_.dtype == object else self.classes_
+        np.savez(
+            filename,
+            feature=self.feature,
+            threshold=self.threshold,
+            left=self.left,
+            right=self.right,
+            value=self.value,
+            roots=self.roots,
+            classes=classes,
+            max_depth=self.max_depth,
+        )
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    def apply(self, X):
+        """Leaf index of every sample in every tree, shape (n_samples, n_estimators)"""
+        # sklearn evaluates trees on float32 inputs
+        X = np.asarray(X, dtype=np.float32)
+        n_samples, n_features = X.shape
+        X = X.ravel()
+
+        nodes = np.tile(self.roots, n_samples)
+        row_offsets = np.repeat(np.arange(n_samples) * n_features, self.n_estimators)
+
+        # Only walk the (sample, tree) pairs that have not reached a leaf yet
+        active = np.arange(len(nodes))
+        while len(active):
+            current = nodes[active]
+            go_left = X[row_offsets[active] + self.feature[current]] <= self.threshold[current]
+            current = np.where(go_left, self.left[current], self.right[current])
+            nodes[active] = current
+            active = active[self.left[current] != current]
+
+        return nodes.reshape(n_samples, self.n_estimators)
+
+    def predict_proba(self, X):
+        """Mean class probabilities over all trees, shape (n_samples, n_classes)"""
+        proba = self.value[self.apply(X)].sum(axis=1)
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, X):
+        """Predicted class labels"""
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+def load_flat_forest(filename):
+    """Load a joblib pickled sklearn forest and flatten it"""
+    return FlatForest.from_sklearn(joblib.load(filename))
+
+def _time_call(function, X, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(X)
+    return (time.perf_counter() - start) / repeat
+
+if __name__ == "__main__":
+    # Micro-benchmark against sklearn, run from the repository root:
+    #   python -m Classification.flat_forest
+    model_file = "Classification/classification_model.pkl"
+    model = joblib.load(model_file)
+    flat_model = FlatForest.from_sklearn(model)
+    print(f"Model: {model_file}, {flat_model.n_estimators} trees, {len(flat_model.feature)} nodes, max depth {flat_model.max_depth}")
+
+    rng = np.random.default_rng(42)
+    print(f"{'Batch':<8} {'sklearn (ms)':<14} {'flat (ms)':<12} {'Speedup':<9} {'Match':<6}")
+    print("-" * 52)
+    for batch_size in (1, 10, 42, 256, 1024):
+        X = np.column_stack((
+            rng.uniform(0, 150, batch_size),
+            rng.uniform(-30, 30, batch_size),
+            rng.uniform(-75, 75, batch_size),
+        ))
+        match = np.array_equal(model.predict(X), flat_model.predict(X))
+        repeat = 20 if batch_size <= 256 else 5
+        sklearn_time = _time_call(model.predict, X, repeat)
+        flat_time = _time_call(flat_model.predict, X, repeat)
+        print(f"{batch_size:<8} {sklearn_time * 1e3:<14.3f} {flat_time * 1e3:<12.3f} {sklearn_time / flat_time:<9.1f} {str(match):<6}")
@@ -0,0 +1,49 @@
+import joblib
+import numpy as np
+from Classification.flat_forest import FlatForest
+
+# Model class -> backend name used by training.py
+BACKEND_NAMES = {
+    "RandomForestClassifier": "random_forest",
+    "LGBMClassifier": "lightgbm",
+    "HistGradientBoostingClassifier": "gradient_boosting",
+}
+
+
+class BoosterClassifier:
+    """
+    Fitted LGBMClassifier predicted through its Booster
+
+    Skips the sklearn wrapper's input validation and runs on one thread, which is
+    faster for the small batches of a radar frame.
+    """
+
+    def __init__(self, model, num_threads=1):
+        self.booster = model.booster_
+        self.classes_ = model.classes_
+        self.num_threads = num_threads
+
+    def predict(self, X):
+        probabilities = self.booster.predict(np.asarray(X, dtype=np.float64), num_threads=self.num_threads)
+        if probabilities.ndim == 1:
+            # Binary model, probability of the second class
+            return self.classes_[(probabilities > 0.5).astype(np.intp)]
+        return self.classes_[probabilities.argmax(axis=1)]
+
+
+def load_model(filename):
+    """Model written by Classification/training.py (RandomForest, LightGBM or HistGradientBoosting)"""
+    return joblib.load(filename)
+
+
+def batch_model(model, use_flat_forest=True):
+    """Fastest predict path of a loaded model, with the same predictions"""
+    if use_flat_forest and hasattr(model, "estimators_") and hasattr(model.estimators_[0], "tree_"):
+        return FlatForest.from_sklearn(model)
+    if hasattr(model, "booster_"):
+        return BoosterClassifier(model)
+    return model
+
+
+def backend_name(model):
+    return BACKEND_NAMES.get(type(model).__name__, type(model).__name__)
@@ -0,0 +1,82 @@
+import json
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score
+from Classification.model_backends import load_model, batch_model, backend_name
+from Classification.training import load_dataset, FEATURES
+from config import *
+
+# Targets per predict call: a single target, one data packet, a full frame
+BATCH_SIZES = (1, 42, 256)
+
+
+def benchmark_model(model_file, x_test, y_test, repeat=200, load_repeat=3):
+    """
+    Size, load time, per-batch latency and test accuracy of one model file
+
+    Latency and accuracy are measured on the predict path CLASSIFICATION_PIPELINE uses
+    (flattened forest, LightGBM Booster or the model itself).
+    """
+    load_times = []
+    for _ in range(load_repeat):
+        start = time.perf_counter()
+        model = load_model(model_file)
+        predictor = batch_model(model, USE_FLAT_FOREST)
+        load_times.append(time.perf_counter() - start)
+
+    # As in CLASSIFICATION_PIPELINE, an sklearn model fitted on a DataFrame gets named columns
+    named_columns = hasattr(predictor, "feature_names_in_")
+    features = np.asarray(x_test[FEATURES], dtype=np.float64)
+    accuracy = accuracy_score(np.asarray(y_test), predictor.predict(x_test[FEATURES] if named_columns else features))
+
+    latency = {}
+    rng = np.random.default_rng(0)
+    for batch_size in BATCH_SIZES:
+        batches = [features[rng.integers(0, len(features), batch_size)] for _ in range(repeat)]
+        if named_columns:
+            batches = [pd.DataFrame(batch, columns=FEATURES) for batch in batches]
+        predictor.predict(batches[0])  # warm up
+        times = []
+        for batch in batches:
+            start = time.perf_counter()
+            predictor.predict(batch)
+            times.append(time.perf_counter() - start)
+        latency[batch_size] = {
+            'mean_ms': round(float(np.mean(times)) * 1e3, 3),
+            'p99_ms': round(float(np.percentile(times, 99)) * 1e3, 3),
+        }
+
+    return {
+        'model_file': model_file,
+        'backend': backend_name(model),
+        'size_bytes': os.path.getsize(model_file),
+        'load_s': round(min(load_times), 3),
+        'accuracy': round(float(accuracy), 4),
+        'latency': latency,
+    }
+
+
+if __name__ == "__main__":
+    # Run from the repository root:
+    #   python -m Classification.model_benchmark dataset.csv model.pkl [model.pkl ...]
+    if len(sys.argv) < 3:
+        raise SystemExit("Usage: python -m Classification.model_benchmark dataset.csv model.pkl [model.pkl ...]")
+    # Same split as training.py, accuracy is measured on the test part
+    _, x_test, _, y_test = load_dataset(sys.argv[1])
+
+    results = [benchmark_model(model_file, x_test, y_test) for model_file in sys.argv[2:]]
+
+    batch_columns = " ".join(f"{f'{size} (ms)':<12}" for size in BATCH_SIZES)
+    print(f"\n{'Model':<40} {'Backend':<16} {'Size (KiB)':<11} {'Load (s)':<9} {'Accuracy':<9} {batch_columns}")
+    print("-" * (88 + 13 * len(BATCH_SIZES)))
+    for result in results:
+        latencies = " ".join(f"{result['latency'][size]['mean_ms']:<12.3f}" for size in BATCH_SIZES)
+        print(f"{os.path.basename(result['model_file']):<40} {result['backend']:<16} {result['size_bytes'] / 1024:<11.0f} "
+              f"{result['load_s']:<9.3f} {result['accuracy']:<9.4f} {latencies}")
+
+    with open("model_benchmark_results.json", "w") as file:
+        json.dump(results, file, indent=4)
+    print("Results saved to model_benchmark_results.json")
@@ -1,39 +1,223 @@
+import argparse
+import os
+import shutil
+import tempfile
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder
 
-filename = "dataset.npy"
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
 
-dataset = np.load(filename, allow_pickle=True)
+filename = "dataset.npy"
+output_file = "custom_radar_classification_dataset.csv"
+columnar_file = "custom_radar_classification_dataset.npz"
 
 class_name = ['vehicle', 'person', 'bicycle', 'uav']
 
-custom_df = pd.DataFrame(columns=["range", "velocity", "azimuth", "class_name"])
-secondary = 0
-print("Iterating over ",len(dataset),"entries.")
-for i in range(len(dataset)):
-    if len(dataset[i]["range"]) == len(dataset[i]["velocity"]) == len(dataset[i]["azimuth"]):
-        print("Processing Entry ",i," : ", len(dataset[i]["range"]), "entries")
-        length = len(dataset[i]["range"])
-        secondary+=length
-        for j in range(length):
-            custom_df.loc[len(custom_df)] = {
-                "range": dataset[i]["range"][j],
-                "velocity": dataset[i]["velocity"][j],
-                "azimuth": dataset[i]["azimuth"][j],
-                "class_name": dataset[i]["class_name"]
+FEATURES = ["range", "velocity", "azimuth"]
+COLUMNS = FEATURES + ["class_name"]
+
+
+def iter_chunks(dataset, chunk_rows=None):
+    """
+    Rows of the dataset as concatenated column arrays, without a per-row Python loop
+
+    Entries whose range/velocity/azimuth lengths differ are skipped.
+
+    Args:
+        dataset: Sequence of dicts with range/velocity/azimuth arrays and a class_name
+        chunk_rows: Yield a chunk once it holds at least this many rows, None yields a single chunk
+
+    Yields:
+        Columns dict and the entries skipped since the previous chunk, as (index, range, velocity, azimuth lengths)
+    """
+    parts, names, lengths, skipped = {feature: [] for feature in FEATURES}, [], [], []
+    rows = 0
+
+    for i, entry in enumerate(dataset):
+        arrays, entry_lengths = _entry_arrays(entry)
+        if len(set(entry_lengths)) != 1:
+            skipped.append((i,) + entry_lengths)
+            continue
+
+        for feature, array in zip(FEATURES, arrays):
+            parts[feature].append(array)
+        names.append(entry["class_name"])
+        lengths.append(entry_lengths[0])
+        rows += entry_lengths[0]
+
+        if chunk_rows is not None and rows >= chunk_rows:
+            yield _columns(parts, names, lengths), skipped
+            parts, names, lengths, skipped = {feature: [] for feature in FEATURES}, [], [], []
+            rows = 0
+
+    if rows or skipped or chunk_rows is None:
+        yield _columns(parts, names, lengths), skipped
+
+
+def _entry_arrays(entry):
+    """Flattened range/velocity/azimuth arrays of an entry and their lengths"""
+    arrays = [np.asarray(entry[feature]).ravel() for feature in FEATURES]
+    return arrays, tuple(len(array) for array in arrays)
+
+
+def _columns(parts, names, lengths):
+    columns = {feature: np.concatenate(arrays) if arrays else np.empty(0) for feature, arrays in parts.items()}
+    # One class name per entry, repeated for each of its rows
+    columns["class_name"] = np.repeat(np.asarray(names, dtype=str), lengths)
+    return columns
+
+
+class NpzWriter:
+    def __init__(self, filename, total_rows, name_length):
+        """
+        .npz file filled chunk by chunk through memory-mapped .npy files next to it
+
+        Args:
+            total_rows: Rows of the finished file
+            name_length: Longest class name
+        """
+        self.filename = filename
+        self.total_rows = total_rows
+        self.name_length = name_length
+        self.directory = None
+        self.arrays = None
+        self.rows = 0
+
+    def write(self, columns):
+        if self.arrays is None:
+            self.directory = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(self.filename)))
+            self.arrays = {
+                name: np.lib.format.open_memmap(
+                    os.path.join(self.directory, f"{name}.npy"), mode="w+", shape=(self.total_rows,),
+                    dtype=f"<U{self.name_length}" if name == "class_name" else values.dtype,
+                )
+                for name, values in columns.items()
             }
+        size = len(columns["class_name"])
+        for name, values in columns.items():
+            self.arrays[name][self.rows:self.rows + size] = values
+        self.rows += size
+
+    def close(self):
+        if self.arrays is None:
+            return
+        if self.rows != self.total_rows:
+            self.abort()
+            raise ValueError(f"{self.filename}: {self.rows} rows written, {self.total_rows} expected")
+        np.savez(self.filename, **self.arrays)
+        self.abort()
+
+    def abort(self):
+        """Remove the memory-mapped arrays without writing the .npz file"""
+        if self.arrays is not None:
+            self.arrays = None
+            shutil.rmtree(self.directory)
+
+
+class ParquetWriter:
+    """.parquet file appended one row group per chunk (needs pyarrow)"""
+
+    def __init__(self, filename):
+        if pa is None:
+            raise ImportError("Parquet output needs pyarrow (pip install pyarrow), or write a .npz file instead")
+        self.filename = filename
+        self.writer = None
+
+    def write(self, columns):
+        table = pa.table(columns)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.filename, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def abort(self):
+        """Close and remove the incomplete file"""
+        if self.writer is not None:
+            self.close()
+            os.remove(self.filename)
+
+
+def build_dataset(dataset, csv_file=output_file, columnar_file=columnar_file, chunk_rows=None):
+    """
+    Write the rows of the dataset to a CSV file and a columnar (.npz or .parquet) copy
+
+    Args:
+        dataset: Sequence of dicts with range/velocity/azimuth arrays and a class_name
+        csv_file: CSV output with the columns range, velocity, azimuth, class_name
+        columnar_file: .npz or .parquet output with the same columns, None to skip it
+        chunk_rows: Rows held in memory at a time, None builds all rows at once
+
+    Returns:
+        Number of rows written and the skipped entries as (index, range, velocity, azimuth lengths)
+    """
+    columnar_writer = None
+    if columnar_file is not None and columnar_file.endswith(".parquet"):
+        columnar_writer = ParquetWriter(columnar_file)
+    elif columnar_file is not None and columnar_file.endswith(".npz"):
+        # The memory-mapped arrays are sized up front, counting rows as iter_chunks does
+        total_rows, name_length = 0, 1
+        for entry in dataset:
+            entry_lengths = _entry_arrays(entry)[1]
+            if len(set(entry_lengths)) == 1:
+                total_rows += entry_lengths[0]
+                name_length = max(name_length, len(str(entry["class_name"])))
+        columnar_writer = NpzWriter(columnar_file, total_rows, name_length)
+    elif columnar_file is not None:
+        raise ValueError(f"Columnar output must be a .npz or .parquet file: {columnar_file}")
+
+    rows = 0
+    skipped = []
+    try:
+        for chunk_number, (columns, chunk_skipped) in enumerate(iter_chunks(dataset, chunk_rows)):
+            skipped.extend(chunk_skipped)
+            pd.DataFrame(columns, columns=COLUMNS).to_csv(csv_file, mode="a" if chunk_number else "w",
+                                                          header=not chunk_number, index=False)
+            if columnar_writer is not None:
+                columnar_writer.write(columns)
+            rows += len(columns["class_name"])
+            if chunk_rows is not None:
+                print(f"Chunk {chunk_number}: {rows} rows written")
+    except BaseException:
+        # An interrupted build leaves no partial columnar file behind
+        if columnar_writer is not None:
+            columnar_writer.abort()
+        raise
+    if columnar_writer is not None:
+        columnar_writer.close()
+    return rows, skipped
+
+
+if __name__ == "__main__":
+    # python preprocessing.py [dataset.npy] [--columnar custom_radar_classification_dataset.parquet] [--chunk-rows 1000000]
+    parser = argparse.ArgumentParser(description="Build the classification dataset CSV from dataset.npy")
+    parser.add_argument("dataset", nargs="?", default=filename)
+    parser.add_argument("--output", default=output_file, help="CSV file")
+    parser.add_argument("--columnar", default=columnar_file,
+                        help="Columnar copy, .npz or .parquet (needs pyarrow), empty to skip it")
+    parser.add_argument("--chunk-rows", type=int, default=None,
+                        help="Write the rows in chunks of this size instead of building them all in memory")
+    args = parser.parse_args()
 
-print("-"*50)
-print("Done Processing All Entries.")
-print("-"*50)
+    dataset = np.load(args.dataset, allow_pickle=True)
+    print("Iterating over ", len(dataset), "entries.")
 
-print(custom_df.head())
-print("-"*50)
+    rows, skipped = build_dataset(dataset, args.output, args.columnar or None, args.chunk_rows)
 
-print("Length of dataset: ", len(dataset))
-print("Length of custom_df: ", len(custom_df))
-print("-"*50)
+    print("-" * 50)
+    print("Done Processing All Entries.")
+    print("-" * 50)
 
-custom_df.to_csv("custom_radar_classification_dataset.csv", index=False)
\ No newline at end of file
+    print("Length of dataset: ", len(dataset))
+    print("Rows written: ", rows)
+    print("Entries skipped (range/velocity/azimuth lengths differ): ", len(skipped))
+    for index, range_length, velocity_length, azimuth_length in skipped:
+        print(f"  Entry {index}: range {range_length}, velocity {velocity_length}, azimuth {azimuth_length}")
+    print("-" * 50)
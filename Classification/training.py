@@ -1,69 +1,160 @@
+import argparse
+import os
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
 from sklearn.metrics import classification_report, accuracy_score
 from sklearn.utils import shuffle
-from sklearn.preprocessing import StandardScaler, LabelEncoder
 import joblib
 
-# Load dataset
-data = pd.read_csv("custom_radar_classification_dataset.csv")
-print("Dataset Loaded: ")
-print(data.head())
-
-# Feature scaling and label encoding
-scaler = StandardScaler()
-label_encoder = LabelEncoder()
-
-x = data[["range", "velocity", "azimuth"]]  # Features
-y = data["class_name"]  # Target/Label
-
-x_scaled = scaler.fit_transform(x)
-y_encoded = label_encoder.fit_transform(y)
-
-# Shuffle the data
-x, y = shuffle(x_scaled, y_encoded, random_state=42)
-x, y = shuffle(x, y, random_state=56)
-x, y = shuffle(x, y, random_state=78)
-print("Shuffling Completed.")
-
-# Split data into training and testing sets
-x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=0.7, random_state=42)
-print("\nData Split Complete:")
-print(f"Training Samples: {len(x_train)}, Testing Samples: {len(x_test)}")
-
-# Random Forest Classifier with hyperparameter tuning
-param_grid = {
-    "n_estimators": [100, 200, 300],
-    "max_depth": [None, 10, 20, 30, 40],
-    "min_samples_split": [2, 5, 10, 15],
-    "min_samples_leaf": [1, 2, 4, 8],
-    "max_features": ["sqrt", "log2", None],
-    "bootstrap": [True, False],
+try:
+    from Classification.budgeted_search import budgeted_search, print_report
+except ImportError:
+    # Run from the Classification directory
+    from budgeted_search import budgeted_search, print_report
+
+DATASET_FILE = "custom_radar_classification_dataset.csv"
+FEATURES = ["range", "velocity", "azimuth"]
+
+
+def load_dataset(filename=DATASET_FILE):
+    """
+    Shuffled train/test split of the dataset
+
+    Features are not scaled and labels stay class names: tree models don't need
+    scaling, and CLASSIFICATION_PIPELINE passes raw features and expects names.
+    The columnar .npz/.parquet copies written by preprocessing.py load faster than the CSV.
+
+    Returns:
+        x_train, x_test, y_train, y_test
+    """
+    if filename.endswith(".npz"):
+        with np.load(filename) as columns:
+            data = pd.DataFrame({name: columns[name] for name in columns.files})
+    elif filename.endswith(".parquet"):
+        data = pd.read_parquet(filename)
+    else:
+        data = pd.read_csv(filename)
+    print("Dataset Loaded: ")
+    print(data.head())
+
+    x = data[FEATURES]  # Features
+    y = data["class_name"]  # Target/Label
+
+    # Shuffle the data
+    x, y = shuffle(x, y, random_state=42)
+    x, y = shuffle(x, y, random_state=56)
+    x, y = shuffle(x, y, random_state=78)
+    print("Shuffling Completed.")
+
+    # Split data into training and testing sets
+    x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=0.7, random_state=42)
+    print("\nData Split Complete:")
+    print(f"Training Samples: {len(x_train)}, Testing Samples: {len(x_test)}")
+    return x_train, x_test, y_train, y_test
+
+
+def train_random_forest(x_train, y_train, **search_options):
+    # Random Forest Classifier with hyperparameter tuning
+    param_grid = {
+        "n_estimators": [100, 200, 300],
+        "max_depth": [None, 10, 20, 30, 40],
+        "min_samples_split": [2, 5, 10, 15],
+        "min_samples_leaf": [1, 2, 4, 8],
+        "max_features": ["sqrt", "log2", None],
+        "bootstrap": [True, False],
+    }
+    estimator = RandomForestClassifier(random_state=42, class_weight="balanced")
+    return _search(estimator, param_grid, x_train, y_train, **search_options)
+
+
+def train_lightgbm(x_train, y_train, **search_options):
+    # Gradient-boosted trees, much smaller than the forest and faster to load and evaluate
+    from lightgbm import LGBMClassifier
+
+    param_grid = {
+        "n_estimators": [50, 100, 200],
+        "num_leaves": [15, 31, 63],
+        "learning_rate": [0.05, 0.1],
+        "min_child_samples": [10, 20, 40],
+    }
+    estimator = LGBMClassifier(random_state=42, class_weight="balanced", verbose=-1)
+    model = _search(estimator, param_grid, x_train, y_train, **search_options)
+    # Frames are small batches, threads cost more than they save
+    model.set_params(n_jobs=1)
+    return model
+
+
+def train_gradient_boosting(x_train, y_train, **search_options):
+    # sklearn's histogram gradient boosting, for setups without lightgbm
+    param_grid = {
+        "max_iter": [100, 200],
+        "max_leaf_nodes": [15, 31, 63],
+        "learning_rate": [0.05, 0.1],
+        "min_samples_leaf": [10, 20, 40],
+    }
+    estimator = HistGradientBoostingClassifier(random_state=42, class_weight="balanced")
+    return _search(estimator, param_grid, x_train, y_train, **search_options)
+
+
+def _search(estimator, param_grid, x_train, y_train, search="grid", **budget):
+    """Exhaustive GridSearchCV, or a budgeted "halving"/"random" search (see budgeted_search) refit on all training data"""
+    if search != "grid":
+        best_params, report = budgeted_search(estimator, param_grid, x_train, y_train, search=search, **budget)
+        print_report(report)
+        print("Best Parameters:", best_params)
+        return estimator.set_params(**best_params).fit(x_train, y_train)
+
+    grid_search = GridSearchCV(
+        estimator=estimator,
+        param_grid=param_grid,
+        cv=5,
+        scoring="accuracy",
+        verbose=2,
+        n_jobs=-1,
+    )
+    grid_search.fit(x_train, y_train)
+    print("Best Parameters:", grid_search.best_params_)
+    return grid_search.best_estimator_
+
+
+# Backend -> (training function, model file)
+BACKENDS = {
+    "random_forest": (train_random_forest, "classification_model_2.pkl"),
+    "lightgbm": (train_lightgbm, "classification_model_lightgbm.pkl"),
+    "gradient_boosting": (train_gradient_boosting, "classification_model_gradient_boosting.pkl"),
 }
 
-grid_search = GridSearchCV(
-    estimator=RandomForestClassifier(random_state=42, class_weight="balanced"),
-    param_grid=param_grid,
-    cv=5,
-    scoring="accuracy",
-    verbose=2,
-    n_jobs=-1,
-)
-
-grid_search.fit(x_train, y_train)
-print("Best Parameters:", grid_search.best_params_)
-
-# Save the best model and preprocessing objects
-best_model = grid_search.best_estimator_
-joblib.dump(best_model, "classification_model_2.pkl")
-print("\nModel Saved as classification_model_2.pkl")
-
-joblib.dump(scaler, "scaler.pkl")
-joblib.dump(label_encoder, "label_encoder.pkl")
-print("Scaler and Label Encoder Saved.")
-
-# Evaluate the model
-y_pred = best_model.predict(x_test)
-print("Accuracy:", accuracy_score(y_test, y_pred))
-print("\nClassification Report:\n", classification_report(y_test, y_pred))
+
+if __name__ == "__main__":
+    # python training.py [random_forest|lightgbm|gradient_boosting] [--search halving --max-fits 500 --max-time 1800]
+    parser = argparse.ArgumentParser(description="Train the radar target classifier")
+    parser.add_argument("backend", nargs="?", default="random_forest", choices=list(BACKENDS))
+    parser.add_argument("--dataset", default=DATASET_FILE, help="CSV, .npz or .parquet file written by preprocessing.py")
+    parser.add_argument("--search", default="grid", choices=["grid", "halving", "random"],
+                        help="grid: exhaustive GridSearchCV, halving/random: budgeted search")
+    parser.add_argument("--candidates", type=int, default=None, help="Parameter sets the budgeted search starts with")
+    parser.add_argument("--max-fits", type=int, default=None, help="Fit budget of the budgeted search")
+    parser.add_argument("--max-time", type=float, default=None, help="Wall time budget (seconds) of the budgeted search")
+    parser.add_argument("--cache", default="search_cache.pkl",
+                        help="Folds and scores of the budgeted search, an interrupted search resumes from it")
+    args = parser.parse_args()
+    train, model_file = BACKENDS[args.backend]
+
+    search_options = {'search': args.search}
+    if args.search != "grid":
+        search_options.update(n_candidates=args.candidates, max_fits=args.max_fits, max_time=args.max_time,
+                              cache_file=os.path.join(os.path.dirname(args.cache), f"{args.backend}_{os.path.basename(args.cache)}"))
+
+    x_train, x_test, y_train, y_test = load_dataset(args.dataset)
+    best_model = train(x_train, y_train, **search_options)
+
+    # Save the best model, set CLASSIFICATION_MODEL in config.py to use it
+    joblib.dump(best_model, model_file)
+    print(f"\nModel Saved as {model_file}")
+
+    # Evaluate the model
+    y_pred = best_model.predict(x_test)
+    print("Accuracy:", accuracy_score(y_test, y_pred))
+    print("\nClassification Report:\n", classification_report(y_test, y_pred))
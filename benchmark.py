@@ -0,0 +1,220 @@
+import json
+import platform
+import resource
+import struct
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+import numpy as np
+from radar_decoder import (HEADER_FORMAT, TARGET_DTYPE, TARGET_SIZE, TARGETS_PER_PACKET,
+                           calculate_checksum, decode_targets, compute_target_columns, build_target_records)
+from frame_reassembly import FrameAssembler
+from radar_tracking import RadarTracker, process_and_track_targets
+from radar_clutter import ClutterMap
+from Classification.CLASSIFICATION_PIPELINE import classification_pipeline_batch
+from config import *
+
+# Stages timed for every frame, in processing order
+STAGES = ("reassemble", "checksum", "decode", "classify", "records", "track", "publish")
+
+FRAME_INTERVAL = 0.1  # Seconds between synthetic frames
+
+
+class SyntheticScene:
+    def __init__(self, n_targets, track_density=0.5, static_fraction=0.5, seed=0):
+        """
+        Synthetic radar frames in the iSYS-5021 header and target layout
+
+        Args:
+            n_targets: Targets per frame (at most 256)
+            track_density: Fraction of the targets that are persistent moving objects,
+                the rest is clutter
+            static_fraction: Fraction of the clutter that is fixed stationary reflectors (walls, poles),
+                the rest is random clutter that changes every frame
+            seed: Random seed, equal seeds give equal frames
+        """
+        self.n_targets = n_targets
+        self.rng = np.random.default_rng(seed)
+        n_objects = int(round(n_targets * track_density))
+
+        # Objects move in x/y and are reported as range/azimuth/radial velocity
+        half_width = MAX_RANGE * np.sin(np.radians(MAX_AZIMUTH))
+        self.position = np.column_stack((
+            self.rng.uniform(5, MAX_RANGE * 0.9, n_objects),
+            self.rng.uniform(-half_width * 0.5, half_width * 0.5, n_objects),
+        ))
+        self.velocity = self.rng.uniform(-3, 3, (n_objects, 2))
+        self.signal_strength = self.rng.uniform(20, 60, n_objects)
+
+        n_static = int(round((n_targets - n_objects) * static_fraction))
+        self.static_range = self.rng.uniform(1, MAX_RANGE, n_static)
+        self.static_azimuth = self.rng.uniform(-MAX_AZIMUTH, MAX_AZIMUTH, n_static)
+
+    def next_targets(self):
+        """Structured array (TARGET_DTYPE) of the next frame"""
+        self.position += self.velocity * FRAME_INTERVAL
+        n_objects = len(self.position)
+        targets = np.zeros(self.n_targets, dtype=TARGET_DTYPE)
+
+        range_ = np.hypot(self.position[:, 0], self.position[:, 1])
+        targets['signal_strength'][:n_objects] = self.signal_strength
+        targets['range'][:n_objects] = range_ + self.rng.normal(0, 0.2, n_objects)
+        targets['azimuth'][:n_objects] = np.degrees(np.arctan2(self.position[:, 1], self.position[:, 0]))
+        # Positive velocity is incoming, towards the radar
+        targets['velocity'][:n_objects] = -(self.position * self.velocity).sum(axis=1) / np.maximum(range_, 1e-6)
+
+        static = slice(n_objects, n_objects + len(self.static_range))
+        targets['signal_strength'][static] = 30
+        targets['range'][static] = self.static_range + self.rng.normal(0, 0.1, len(self.static_range))
+        targets['azimuth'][static] = self.static_azimuth
+
+        clutter = slice(n_objects + len(self.static_range), self.n_targets)
+        n_clutter = self.n_targets - n_objects - len(self.static_range)
+        targets['signal_strength'][clutter] = self.rng.uniform(10, 40, n_clutter)
+        targets['range'][clutter] = self.rng.uniform(1, MAX_RANGE, n_clutter)
+        targets['velocity'][clutter] = self.rng.normal(0, 0.5, n_clutter)
+        targets['azimuth'][clutter] = self.rng.uniform(-MAX_AZIMUTH, MAX_AZIMUTH, n_clutter)
+        return targets
+
+
+def make_datagrams(frame_id, targets):
+    """Header and data packets of one frame, as sent by the radar"""
+    target_bytes = targets.tobytes()
+    n_packets = max((len(targets) + TARGETS_PER_PACKET - 1) // TARGETS_PER_PACKET, 1)
+    checksum = sum(target_bytes) & 0xFFFFFFFF
+    header = struct.pack(HEADER_FORMAT, frame_id, 1, 0, 0, len(targets), len(targets), checksum, TARGET_SIZE, n_packets)
+
+    packet_bytes = TARGETS_PER_PACKET * TARGET_SIZE
+    packets = []
+    for number in range(n_packets):
+        chunk = target_bytes[number * packet_bytes:(number + 1) * packet_bytes]
+        packets.append(struct.pack('<HH', frame_id, number) + chunk + b"\x00" * (packet_bytes - len(chunk)))
+    return [header] + packets
+
+
+def run_frames(frames, timings=None):
+    """
+    Run frames through reassembly, checksum, decode, classify, tracking and publish serialization
+
+    Args:
+        frames: List of (datagrams, timestamp)
+        timings: Dict stage -> list, receives the seconds spent per frame (None to not time)
+    """
+    assembler = FrameAssembler()
+    # Same setup as RadarProcessor: with a classifier, "classify" only covers per-detection classification
+    # and the track-level classification is part of "track"
+    classifier = classification_pipeline_batch if TRACK_CLASSIFICATION_INTERVAL else None
+    tracker = RadarTracker(max_distance=5.0, max_age=3, hit_threshold=2, classifier=classifier)
+    clutter_map = ClutterMap() if CLUTTER_MAP else None
+    clock = time.perf_counter
+
+    for datagrams, timestamp in frames:
+        t0 = clock()
+        completed = []
+        for datagram in datagrams:
+            completed.extend(assembler.add_datagram(datagram, timestamp))
+        t1 = clock()
+
+        for frame in completed:
+            calculate_checksum(frame.data, frame.nr_of_targets, frame.bytes_per_target)
+            t2 = clock()
+            target_array = decode_targets(frame.data, max_targets=frame.nr_of_targets)
+            if clutter_map is not None:
+                target_array = target_array[clutter_map.update(target_array['range'], target_array['velocity'],
+                                                               target_array['azimuth'], timestamp)]
+            columns = compute_target_columns(target_array)
+            t3 = clock()
+            if classifier is None:
+                classifications = classification_pipeline_batch(columns['range'], columns['speed'], columns['azimuth']).tolist()
+            else:
+                classifications = [None] * len(columns['range'])
+            t4 = clock()
+            targets = build_target_records(columns, classifications, frame.frame_id, str(timestamp), RADAR_ID, AREA_ID)
+            t5 = clock()
+            tracked_targets = process_and_track_targets(targets, tracker, timestamp)
+            t6 = clock()
+            # What publish_target sends, without a broker
+            payloads = [json.dumps(target.to_dict()) for target in tracked_targets]
+            t7 = clock()
+
+            if timings is not None:
+                for stage, elapsed in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4, t6 - t5, t7 - t6)):
+                    timings[stage].append(elapsed)
+
+
+def benchmark(n_targets, track_density=0.5, n_frames=200, warmup_frames=20, seed=0):
+    """Per-stage µs/frame, frames/s and peak memory for one target count and track density"""
+    scene = SyntheticScene(n_targets, track_density, seed)
+    frames = [
+        (make_datagrams(frame_id % 65536, scene.next_targets()), frame_id * FRAME_INTERVAL)
+        for frame_id in range(warmup_frames + n_frames)
+    ]
+
+    # Warm up caches (velocity filter weights, Kalman matrices) on the first frames, time the rest
+    run_frames(frames[:warmup_frames])
+    timings = {stage: [] for stage in STAGES}
+    start = time.perf_counter()
+    run_frames(frames[warmup_frames:], timings)
+    elapsed = time.perf_counter() - start
+
+    # Separate pass for memory, tracemalloc slows everything down
+    tracemalloc.start()
+    run_frames(frames[warmup_frames:])
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stages = {
+        stage: {
+            'us_per_frame': round(float(np.mean(values)) * 1e6, 2),
+            'p99_us': round(float(np.percentile(values, 99)) * 1e6, 2),
+        }
+        for stage, values in timings.items()
+    }
+    return {
+        'targets': n_targets,
+        'track_density': track_density,
+        'frames': n_frames,
+        'stages': stages,
+        'total_us_per_frame': round(sum(stage['us_per_frame'] for stage in stages.values()), 2),
+        'frames_per_second': round(n_frames / elapsed, 1),
+        'peak_traced_memory_bytes': peak_memory,
+    }
+
+
+def run_benchmarks(target_counts=(10, 42, 100, 256), track_densities=(0.2, 0.8), n_frames=200):
+    results = []
+    for n_targets in target_counts:
+        for track_density in track_densities:
+            result = benchmark(n_targets, track_density, n_frames)
+            results.append(result)
+            stages = " ".join(f"{stage} {result['stages'][stage]['us_per_frame']:.0f}" for stage in STAGES)
+            print(f"{n_targets:>4} targets, density {track_density:.1f}: {result['total_us_per_frame']:>9.1f} µs/frame, "
+                  f"{result['frames_per_second']:>7.1f} fps, peak {result['peak_traced_memory_bytes'] / 1024:.0f} KiB | {stages}")
+
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'settings': {
+            'tracker_backend': TRACKER_BACKEND,
+            'tracker_association': TRACKER_ASSOCIATION,
+            'tracker_gating': TRACKER_GATING,
+            'use_flat_forest': USE_FLAT_FOREST,
+            'track_classification_interval': TRACK_CLASSIFICATION_INTERVAL,
+            'clutter_map': CLUTTER_MAP,
+        },
+        # Linux reports kilobytes
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'results': results,
+    }
+
+
+if __name__ == "__main__":
+    # python benchmark.py [results.json]
+    output_file = sys.argv[1] if len(sys.argv) > 1 else "benchmark_results.json"
+    report = run_benchmarks()
+    with open(output_file, "w") as file:
+        json.dump(report, file, indent=4)
+    print(f"Results saved to {output_file}")
@@ -6,6 +6,12 @@ MQTT_CHANNEL = "radar_surveillance"
 MQTT_BROKER_SUBSCRIBER = "localhost" # Change to your broker's IP address
 MQTT_USERNAME = ""
 MQTT_PASSWORD = ""
+MQTT_PUBLISH_MODE = "target"  # "target": one JSON message per tracked target, "frame": one message per frame with all tracks
+MQTT_ENCODING = "json"  # Frame mode payload: "json" (orjson if installed), "msgpack" (needs msgpack) or "columnar" (JSON, one list per key)
+MQTT_QOS = 0  # 0: at most once, 1: at least once, 2: exactly once
+MQTT_BATCH_WINDOW = 0.0  # Frame mode: seconds of frames sent in one message, 0 sends every frame on its own
+MQTT_RECONNECT_MIN_DELAY = 1  # radar_service.py: seconds before the first reconnect attempt, doubled after each failure
+MQTT_RECONNECT_MAX_DELAY = 120  # ... up to this many seconds
 
 
 # Radar Configuration
@@ -17,6 +23,32 @@ RADAR_LONG = 74.01219  #  radar longitude
 LOCAL_IP = "192.168.252.2" # Static IP of the Ethernet
 LOCAL_PORT = 2050
 
+# Radars served by radar_service.py and radar_supervisor.py, one entry per iSYS-5021
+RADARS = [
+    {
+        'radar_id': RADAR_ID,
+        'area_id': AREA_ID,
+        'local_ip': LOCAL_IP,
+        'local_port': LOCAL_PORT,
+        'latitude': RADAR_LAT,
+        'longitude': RADAR_LONG,
+    },
+]
+
+# UDP ingestion
+SOCKET_RECEIVE_BUFFER = 4 * 1024 * 1024  # Requested kernel receive buffer (SO_RCVBUF) in bytes
+RECEIVE_BATCH_SIZE = 32  # Maximum datagrams read per batch
+RECEIVE_RING_SIZE = 64  # Preallocated receive buffers
+
+# Frame reassembly
+FRAME_TIMEOUT = 0.5  # Seconds to wait for all data packets of a frame before dropping it
+MAX_PENDING_FRAMES = 8  # Incomplete frames buffered at the same time
+
+# Capture and replay (radar_capture.py)
+CAPTURE_FILE = None  # Record every received datagram with its receive time to this file, e.g. "radar.cap"
+REPLAY_FILE = None  # Read datagrams from this capture file instead of the radar
+REPLAY_SPEED = 1.0  # 1.0 = real time, N = N times faster, 0 = as fast as possible
+
 
 # Define thresholds for valid detection
 SNR_THRESHOLD = 3  
@@ -25,8 +57,56 @@ SIGNAL_STRENGTH_THRESHOLD = 18  # Minimum valid signal strength (in dB)
 # constants
 EARTH_R = 6371000 # Earth radius in meters
 
+# Processing pipeline
+USE_PIPELINE = True  # Run receive, decode/classify/track and publish on separate threads
+FRAME_QUEUE_SIZE = 16  # Frames waiting for decode/classify/track
+FRAME_QUEUE_POLICY = "drop_oldest"  # "drop_oldest" or "block"
+RESULT_QUEUE_SIZE = 32  # Processed frames waiting for publish/output
+RESULT_QUEUE_POLICY = "drop_oldest"  # "drop_oldest" or "block"
+PIPELINE_METRICS_INTERVAL = 10  # Seconds between pipeline metric printouts
+
+# Metrics
+METRICS_HOST = "0.0.0.0"  # Address of the Prometheus metrics endpoint
+METRICS_PORT = 9108  # Port of the metrics endpoint (GET /metrics) of main.py, None disables it
+
+# asyncio service (radar_service.py)
+HEALTH_HOST = "0.0.0.0"  # Address of the HTTP health endpoint
+HEALTH_PORT = 8080  # Port of the HTTP health endpoint (GET /health)
+
+# Multi-radar supervisor (radar_supervisor.py)
+SUPERVISOR_QUEUE_SIZE = 256  # Processed frames waiting for the shared output
+SUPERVISOR_REPORT_INTERVAL = 10  # Seconds between per-radar throughput reports
+
+# Tracking Configuration
+TRACKER_BACKEND = "batch"  # "batch": all Kalman filters in stacked NumPy arrays, "filterpy": one filterpy filter per track
+TRACKER_ASSOCIATION = "hungarian"  # "hungarian": optimal assignment, "greedy": nearest free detection per track
+TRACKER_GATING = "grid"  # "grid": only score track/detection pairs in neighbouring grid cells, "dense": score every pair
+TRACKER_DT_RESOLUTION = 0.005  # Time steps between frames are rounded to this (seconds), F/Q are cached per step
+TRACKER_MAX_DT = 1.0  # Longest time step the tracks are predicted over (seconds)
+TRACK_HISTORY_DEPTH = 50  # Detections and classifications kept per track
+TRACK_CLASSIFICATION_DECAY = 1.0  # Weight of a classification vote relative to the next one, 1.0 = plain majority vote
+TRACK_CLASSIFICATION_INTERVAL = 10  # Classify per track: new tracks and every N frames, the track's label is reused in between (None classifies every detection)
+TRACK_CLASSIFICATION_DRIFT = (5.0, 1.0, 5.0)  # Reclassify a track earlier when its range (m), speed (m/s) or azimuth (deg) changed this much
+
+# Clutter map (radar_clutter.py), over the MAX_RANGE / MAX_AZIMUTH grid
+CLUTTER_MAP = True  # Learn the range/azimuth cells of stationary returns (walls, poles, parked vehicles) and drop those returns before classification and tracking
+CLUTTER_RANGE_RESOLUTION = 1.0  # Cell size in meters
+CLUTTER_AZIMUTH_RESOLUTION = 2.0  # Cell size in degrees
+CLUTTER_VELOCITY_THRESHOLD = 0.1  # Returns with |velocity| up to this (m/s) count as stationary
+CLUTTER_THRESHOLD = 20  # Frames with a stationary return (decayed) before a cell is clutter
+CLUTTER_HALF_LIFE = 30.0  # Seconds for a cell's evidence to halve, a cell stops being clutter at most this long after its returns stop
+
+# Classification Configuration
+CLASSIFICATION_MODEL = "Classification/classification_model.pkl"  # Model written by Classification/training.py, RandomForest or LightGBM
+USE_FLAT_FOREST = True  # Evaluate the RandomForest through Classification/flat_forest.py instead of sklearn
+
 # Output Configuration
-OUTPUT_FILE = "detected_targets.json"
+OUTPUT_FILE = "detected_targets.ndjson"  # Detections, one JSON object per line
+DETECTION_LOG_FLUSH_SIZE = 500  # Write buffered detections once this many are collected
+DETECTION_LOG_FLUSH_INTERVAL = 2.0  # ... or when this many seconds passed since the last write
+DETECTION_LOG_MAX_FILE_SIZE = 100 * 1024 * 1024  # Rotate the file at this size in bytes (None disables)
+DETECTION_LOG_ROTATE_INTERVAL = 24 * 60 * 60  # Rotate the file after this many seconds (None disables)
+DETECTION_LOG_BACKUP_COUNT = 14  # Rotated files to keep (None keeps all)
 
 # Basic Information
 MAX_RANGE = 150  # Maximum detection range in meters
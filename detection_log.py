@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from config import *
+
+
+class DetectionRecorder:
+    def __init__(self, filename=OUTPUT_FILE, flush_size=DETECTION_LOG_FLUSH_SIZE, flush_interval=DETECTION_LOG_FLUSH_INTERVAL,
+                 max_file_size=DETECTION_LOG_MAX_FILE_SIZE, rotate_interval=DETECTION_LOG_ROTATE_INTERVAL,
+                 backup_count=DETECTION_LOG_BACKUP_COUNT):
+        """
+        Append detections to a newline-delimited JSON file in batches
+
+        A background thread writes the buffer once flush_interval passed, also when no
+        further detections arrive. Recording after close() raises ValueError.
+
+        Args:
+            filename: NDJSON file, one target per line
+            flush_size: Write the buffer once it holds this many targets
+            flush_interval: Write the buffer when this many seconds passed since the last write (None: size only)
+            max_file_size: Rotate the file once it is larger than this (bytes, None disables)
+            rotate_interval: Rotate the file after this many seconds (None disables)
+            backup_count: Number of rotated files to keep (None keeps all)
+        """
+        self.filename = filename
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_file_size = max_file_size
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+
+        # Reentrant, close() may run from a signal handler interrupting record() on the same thread
+        self.lock = threading.RLock()
+        self.buffer = []
+        self.file = None
+        self.opened_at = None
+        self.last_flush = time.monotonic()
+        self.closed = False
+        self.stop_event = threading.Event()
+        self.flush_thread = None
+
+        self.targets_written = 0
+        self.files_rotated = 0
+
+    def record(self, targets):
+        """Buffer the TargetRecords of one frame, writes them out according to the flush policy"""
+        with self.lock:
+            if self.closed:
+                raise ValueError(f"Detection log {self.filename} is closed")
+            if self.flush_thread is None and self.flush_interval is not None:
+                self.flush_thread = threading.Thread(target=self._flush_loop, name="detection-log-flush", daemon=True)
+                self.flush_thread.start()
+            self.buffer.extend(targets)
+            if len(self.buffer) >= self.flush_size or self._flush_due():
+                self._flush()
+
+    def flush(self):
+        with self.lock:
+            if not self.closed:
+                self._flush()
+
+    def close(self):
+        """Write what is left and close the file"""
+        # Not joined, the thread may be waiting for the lock this thread holds. It ends on its next wakeup.
+        self.stop_event.set()
+        with self.lock:
+            if self.closed:
+                return
+            self._flush()
+            self.closed = True
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def _flush_due(self):
+        return self.flush_interval is not None and time.monotonic() - self.last_flush >= self.flush_interval
+
+    def _flush_loop(self):
+        # Writes buffered detections when the stream goes quiet, record() handles the busy case
+        while not self.stop_event.wait(self.flush_interval / 4):
+            with self.lock:
+                if self.buffer and not self.closed and self._flush_due():
+                    self._flush()
+
+    def _flush(self):
+        self.last_flush = time.monotonic()
+        if not self.buffer:
+            return
+
+        if self.file is None:
+            self._open()
+        elif self._needs_rotation():
+            self._rotate()
+
+        self.file.write("".join(json.dumps(target.to_dict(), separators=(',', ':')) + "\n" for target in self.buffer))
+        self.file.flush()
+        self.targets_written += len(self.buffer)
+        self.buffer = []
+
+    def _open(self):
+        self.file = open(self.filename, "a", encoding="utf-8")
+        self.opened_at = time.monotonic()
+
+    def _needs_rotation(self):
+        if self.max_file_size is not None and self.file.tell() >= self.max_file_size:
+            return True
+        if self.rotate_interval is not None and time.monotonic() - self.opened_at >= self.rotate_interval:
+            return True
+        return False
+
+    def _rotate(self):
+        self.file.close()
+        root, ext = os.path.splitext(self.filename)
+        rotated = f"{root}.{datetime.now().strftime('%Y%m%d-%H%M%S')}{ext}"
+        suffix = 1
+        while os.path.exists(rotated):
+            rotated = f"{root}.{datetime.now().strftime('%Y%m%d-%H%M%S')}-{suffix}{ext}"
+            suffix += 1
+        os.replace(self.filename, rotated)
+        self.files_rotated += 1
+        self._remove_old_backups(root, ext)
+        self._open()
+
+    def _remove_old_backups(self, root, ext):
+        if self.backup_count is None:
+            return
+        directory = os.path.dirname(root) or "."
+        prefix = os.path.basename(root) + "."
+        backups = sorted(
+            name for name in os.listdir(directory)
+            if name.startswith(prefix) and name.endswith(ext) and name != os.path.basename(self.filename)
+        )
+        for name in backups[:max(len(backups) - self.backup_count, 0)]:
+            os.remove(os.path.join(directory, name))
+
+    def get_stats(self):
+        return {
+            'targets_written': self.targets_written,
+            'targets_buffered': len(self.buffer),
+            'files_rotated': self.files_rotated,
+        }
@@ -0,0 +1,207 @@
+import struct
+import time
+from collections import OrderedDict, deque
+from radar_decoder import HEADER_SIZE, DATA_PACKET_SIZE, DATA_PACKET_PREFIX, MAX_DATA_PACKETS, parse_header, calculate_checksum
+from radar_metrics import METRICS
+from config import *
+
+DATA_PACKET_PREFIX_FORMAT = '<HH'  # frame ID, data packet number
+
+
+class RadarFrame:
+    """One complete data set: header values plus the target list of all its data packets"""
+
+    __slots__ = ('frame_id', 'detections', 'nr_of_targets', 'bytes_per_target', 'checksum', 'data', 'received_at')
+
+    def __init__(self, frame_id, detections, nr_of_targets, bytes_per_target, checksum, data, received_at):
+        self.frame_id = frame_id
+        self.detections = detections
+        self.nr_of_targets = nr_of_targets
+        self.bytes_per_target = bytes_per_target
+        self.checksum = checksum
+        # 4 byte prefix of the first data packet followed by all target lists,
+        # so it can be passed to calculate_checksum / decode_targets like a single packet
+        self.data = data
+        self.received_at = received_at
+
+
+class _PendingFrame:
+    __slots__ = ('header', 'packets', 'first_seen', 'next_packet', 'reordered')
+
+    def __init__(self, first_seen):
+        self.header = None
+        self.packets = {}
+        self.first_seen = first_seen
+        self.next_packet = 0
+        self.reordered = False
+
+
+class FrameAssembler:
+    def __init__(self, frame_timeout=FRAME_TIMEOUT, max_pending_frames=MAX_PENDING_FRAMES, radar_id=RADAR_ID):
+        """
+        Reassemble radar data sets from header and data packet datagrams
+
+        Args:
+            frame_timeout: Seconds to wait for the missing packets of a frame before dropping it
+            max_pending_frames: Maximum number of incomplete frames buffered at the same time
+            radar_id: Label of the exported metrics
+        """
+        self.frame_timeout = frame_timeout
+        self.max_pending_frames = max_pending_frames
+        self.pending = OrderedDict()  # frame_id -> _PendingFrame
+        self.recent_frames = deque(maxlen=64)  # frame IDs already emitted or dropped
+
+        self.frames_completed = 0
+        self.frames_dropped = 0
+        self.frames_reordered = 0
+        self.packets_duplicate = 0
+        self.packets_late = 0
+        self.packets_invalid = 0
+        self.checksum_failures = 0
+
+        self.checksum_time = METRICS.histogram("radar_stage_seconds", "Processing time per frame and stage", radar=radar_id, stage="checksum")
+        METRICS.gauge("radar_frames_dropped_total", lambda: self.frames_dropped, "Frames dropped", kind="counter",
+                      radar=radar_id, reason="incomplete")
+        METRICS.gauge("radar_checksum_failures_total", lambda: self.checksum_failures, "Frames with a wrong checksum",
+                      kind="counter", radar=radar_id, source="reassembly")
+
+    def add_datagram(self, datagram, received_at=None):
+        """
+        Add one received datagram
+
+        Args:
+            datagram: Header or data packet
+            received_at: Receive time (time.time()), defaults to now
+
+        Returns:
+            List of RadarFrame completed by this datagram (usually empty or one frame)
+        """
+        now = time.time() if received_at is None else received_at
+        self.expire(now)
+
+        if len(datagram) == HEADER_SIZE:
+            frame_id = struct.unpack_from('<H', datagram)[0]
+            pending = self._get_pending(frame_id, now)
+            if pending is None:
+                return []
+            if pending.header is not None:
+                self.packets_duplicate += 1
+                return []
+            pending.header = parse_header(datagram)
+            if pending.packets:
+                # Data packets arrived before their header
+                self._mark_reordered(pending)
+
+        elif len(datagram) == DATA_PACKET_SIZE:
+            frame_id, packet_number = struct.unpack_from(DATA_PACKET_PREFIX_FORMAT, datagram)
+            if packet_number >= MAX_DATA_PACKETS:
+                self.packets_invalid += 1
+                return []
+            pending = self._get_pending(frame_id, now)
+            if pending is None:
+                return []
+            if packet_number in pending.packets:
+                self.packets_duplicate += 1
+                return []
+            if pending.header is None or packet_number != pending.next_packet:
+                self._mark_reordered(pending)
+            pending.packets[packet_number] = bytes(datagram)
+            pending.next_packet = max(pending.next_packet, packet_number + 1)
+
+        else:
+            self.packets_invalid += 1
+            return []
+
+        frame = self._complete(frame_id, pending, now)
+        return [frame] if frame is not None else []
+
+    def expire(self, now=None):
+        """Drop incomplete frames older than frame_timeout, returns the number dropped"""
+        now = time.time() if now is None else now
+        dropped = 0
+        # Frames are kept in arrival order, so only the front needs checking
+        while self.pending:
+            frame_id, pending = next(iter(self.pending.items()))
+            if now - pending.first_seen < self.frame_timeout:
+                break
+            self._drop(frame_id)
+            dropped += 1
+        return dropped
+
+    def get_stats(self):
+        """
+        Counters as dict
+
+        frames_reordered counts frames, each once, whose header and data packets did not arrive
+        in the order header, packet 0, 1, ... The packets_* counters count datagrams.
+        """
+        return {
+            'frames_completed': self.frames_completed,
+            'frames_dropped': self.frames_dropped,
+            'frames_pending': len(self.pending),
+            'frames_reordered': self.frames_reordered,
+            'packets_duplicate': self.packets_duplicate,
+            'packets_late': self.packets_late,
+            'packets_invalid': self.packets_invalid,
+            'checksum_failures': self.checksum_failures,
+        }
+
+    def _get_pending(self, frame_id, now):
+        pending = self.pending.get(frame_id)
+        if pending is not None:
+            return pending
+
+        if frame_id in self.recent_frames:
+            # Packet of a frame that was already emitted or dropped
+            self.packets_late += 1
+            return None
+
+        if len(self.pending) >= self.max_pending_frames:
+            self._drop(next(iter(self.pending)))
+
+        pending = _PendingFrame(now)
+        self.pending[frame_id] = pending
+        return pending
+
+    def _mark_reordered(self, pending):
+        if not pending.reordered:
+            pending.reordered = True
+            self.frames_reordered += 1
+
+    def _drop(self, frame_id):
+        del self.pending[frame_id]
+        self.recent_frames.append(frame_id)
+        self.frames_dropped += 1
+
+    def _complete(self, frame_id, pending, now):
+        if pending.header is None:
+            return None
+
+        detections, targets, data_packets, expected_checksum, bytes_per_target, _ = pending.header
+        if len(pending.packets) < data_packets:
+            return None
+
+        if any(packet_number >= data_packets for packet_number in pending.packets):
+            # More data packets than announced in the header
+            self.packets_invalid += 1
+            self._drop(frame_id)
+            return None
+
+        del self.pending[frame_id]
+        self.recent_frames.append(frame_id)
+
+        if data_packets:
+            packets = [pending.packets[packet_number] for packet_number in range(data_packets)]
+            data = packets[0][:DATA_PACKET_PREFIX] + b''.join(packet[DATA_PACKET_PREFIX:] for packet in packets)
+        else:
+            data = struct.pack(DATA_PACKET_PREFIX_FORMAT, frame_id, 0)
+
+        start = time.perf_counter()
+        checksum = calculate_checksum(data, targets, bytes_per_target)
+        self.checksum_time.record(time.perf_counter() - start)
+        if checksum != expected_checksum:
+            self.checksum_failures += 1
+            return None
+
+        self.frames_completed += 1
+        return RadarFrame(frame_id, detections, targets, bytes_per_target, expected_checksum, data, pending.first_seen)
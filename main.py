@@ -1,26 +1,47 @@
 import numpy as np
-from radar_tracking import RadarTracker, process_and_track_targets
-import socket
-import struct
-import math
+from radar_decoder import parse_header, calculate_checksum, TARGETS_PER_PACKET
+from frame_reassembly import FrameAssembler
+from udp_receiver import DatagramReceiver
+from radar_capture import CaptureReceiver
+from radar_processing import RadarProcessor
+from radar_pipeline import RadarPipeline, BLOCK
+from detection_log import DetectionRecorder
+from radar_publisher import FramePublisher
+from radar_metrics import METRICS, MetricsServer
 import numpy as np
 import json
 import signal
 import sys
-import pytz
-from datetime import datetime
+import time
 import paho.mqtt.client as mqtt
-from Classification.CLASSIFICATION_PIPELINE import classification_pipeline
 from config import *
 
 
-ist_timezone = pytz.timezone('Asia/Kolkata')
-
-targets_data = []  # List to store valid targets
+detection_recorder = DetectionRecorder()  # Streams valid targets to OUTPUT_FILE
 
 tracked_targets_list = []
 
-radar_tracker = RadarTracker(max_distance=5.0, max_age=3, hit_threshold=2)
+radar_processor = RadarProcessor(radar_id="radar-pune", area_id="area-1")
+radar_tracker = radar_processor.tracker
+
+frame_assembler = FrameAssembler(radar_id=radar_processor.radar_id)
+
+# Datagrams come from the radar, or from a capture file when REPLAY_FILE is set
+datagram_receiver = CaptureReceiver() if REPLAY_FILE else DatagramReceiver()
+
+# Counters of the legacy single-packet path (process_packet) and the publish stage, exported on /metrics
+packet_checksum_failures = METRICS.counter("radar_checksum_failures_total", "Frames with a wrong checksum",
+                                           radar=radar_processor.radar_id, source="packet")
+publish_time = METRICS.histogram("radar_stage_seconds", "Processing time per frame and stage",
+                                 radar=radar_processor.radar_id, stage="publish")
+METRICS.gauge("radar_datagrams_received_total", lambda: datagram_receiver.datagrams_received, "Datagrams received",
+              kind="counter", radar=radar_processor.radar_id)
+METRICS.gauge("radar_kernel_drops_total", lambda: getattr(datagram_receiver, 'kernel_drops', None),
+              "Datagrams dropped by the kernel (receive buffer full)", kind="counter", radar=radar_processor.radar_id)
+
+metrics_server = None  # MetricsServer when METRICS_PORT is set
+
+radar_pipeline = None  # RadarPipeline when running with USE_PIPELINE
 
 def on_connect(client, userdata, flags, rc):
         # global is_connected_to_mqtt_flag
@@ -54,40 +75,47 @@ if SEND_MQTT:
         print(f"Failed to connect to MQTT broker: {e}")
         sys.exit(1)
 
+    # One message per target or per frame, see MQTT_PUBLISH_MODE
+    mqtt_publisher = FramePublisher(lambda payload, qos: mqtt_client.publish(MQTT_CHANNEL, payload, qos=qos))
+
 
 def save_to_json():
-    with open(OUTPUT_FILE, "w") as file:
-        json.dump(targets_data, file, indent=4)
-    print(f"Data saved to {OUTPUT_FILE}")
+    # Detections are streamed while running, only the buffered rest is left to write
+    detection_recorder.close()
+    print(f"Data saved to {OUTPUT_FILE} ({detection_recorder.get_stats()['targets_written']} targets)")
 
 def signal_handler(sig, frame):
     print("\nCtrl+C detected! Saving data and exiting...")
+    shutdown()
+    sys.exit(0)
+
+def shutdown():
+    if radar_pipeline is not None:
+        radar_pipeline.stop()
+        print(f"Pipeline: {radar_pipeline.get_metrics()}")
     save_to_json()
     
     # Save tracked targets
-    tracked_targets = [track.get_state() for track in radar_tracker.tracks]
+    tracked_targets = [track.get_state(radar_tracker.now).to_dict() for track in radar_tracker.tracks]
     with open("tracked_targets.json", "w") as file:
         json.dump(tracked_targets, file, indent=4)
     print("Tracked targets saved to tracked_targets.json")
+    print(f"UDP receiver: {datagram_receiver.get_stats()}")
+    print(f"Frame reassembly: {frame_assembler.get_stats()}")
+    if metrics_server is not None:
+        metrics_server.stop()
     
     # Disconnect MQTT
     if SEND_MQTT:
+        mqtt_publisher.close()
+        print(f"MQTT: {mqtt_publisher.get_stats()}")
         print("Disconnecting from MQTT broker...")
         mqtt_client.loop_stop()
         mqtt_client.disconnect()
-    
-    sys.exit(0)
 
 # Register the signal handler for graceful shutdown
 signal.signal(signal.SIGINT, signal_handler)
 
-def publish_target(target):
-    try:
-        mqtt_client.publish(MQTT_CHANNEL, json.dumps(target))
-        # print(f"Published target: {target}")
-    except Exception as e:
-        print(f"Failed to publish target: {e}")
-
 # Simple Moving Average Filter
 def moving_average_filter(data, window_size=5):
     return np.convolve(data, np.ones(window_size)/window_size, mode='valid')
@@ -113,125 +141,19 @@ class KalmanFilter:
 
         return self.estimate
 
-# Checksum Calculation
-def calculate_checksum(data, nrOfTargets, bytesPerTarget):
-    target_list = data[4:]
-    checksum = 0
-
-    try:
-        for i in range(nrOfTargets * bytesPerTarget):
-            checksum += target_list[i]
-            checksum &= 0xFFFFFFFF
-        
-    except IndexError:
-         print("Warning: Index out of range while calculating checksum. Ignoring and continuing...")
-
-    return checksum
-
-# Parse Header
-def parse_header(data):
-    header_format = '<HHHHHHIHH118x'
-    header_size = struct.calcsize(header_format)
-    
-    if len(data) < header_size:
-        print("Incomplete header data.")
-        return None
-    
-    frame_id, fw_major, fw_fix, fw_minor, detections, targets, checksum, bytes_per_target, data_packets = struct.unpack(
-        header_format, data[:header_size]
-    )
-
-    # print(f"Frame ID: {frame_id}")
-    # print(f"Number of Targets: {targets}")
-    
-    return detections, targets, data_packets, checksum, bytes_per_target, frame_id
-
-# Parse Data Packet
-def parse_data_packet(data, frame_id):
-    target_format = '<ffffII'  # Signal Strength, Range, Velocity, Azimuth, Reserved1, Reserved2
-    target_size = struct.calcsize(target_format)
-    target_list = data[4:]
-    
-    targets = []
-    kalman_filter_velocity = KalmanFilter()
-    
-    for i in range(42):  # 42 targets per packet
-        start = i * target_size
-        end = start + target_size
-
-        if end > len(target_list):
-            # print(f"Warning: Not enough data to extract target {i}. Skipping.")
-            break  # Stop processing if data is insufficient
-
-        target_data = target_list[i * target_size:(i + 1) * target_size]
-        signal_strength, range_, velocity, azimuth, reserved1, reserved2 = struct.unpack(target_format, target_data)
-
-        
+# Record, publish and display the result of one frame
+def output_targets(frame_id, targets, tracked_targets):
+    detection_recorder.record(targets)
 
-        # if velocity == 0 :
-        #     # cluter filtering
-        #     continue
-        # # Filter targets below signal strength threshold
-        # if signal_strength < SIGNAL_STRENGTH_THRESHOLD:
-        #     continue
-
-        # Apply Kalman filter for velocity tracking
-        filtered_velocity = kalman_filter_velocity.update(velocity)
-
-
-        # Calculate the x and y position of the target
-        azimuth_angle_radians = math.radians(azimuth)
-        x = range_ * math.cos(azimuth_angle_radians)
-        y = range_ * math.sin(azimuth_angle_radians)
-
-        # Calculate the latitude and longitude of the object            
-        radar_lat_rad = math.radians(RADAR_LAT)
-        delta_lat_deg = y / 111139
-        delta_lon_deg = x / (111139 * math.cos(radar_lat_rad))
-        object_lat = RADAR_LAT + delta_lat_deg
-        object_lon = RADAR_LONG + delta_lon_deg
-
-        classification = classification_pipeline(range_, filtered_velocity, azimuth)
-        if classification=="uav":
-            classification="others"
-        elif classification=="bicycle":
-            classification="person"
-
-        ist_timestamp = datetime.now(ist_timezone)
-
-        target_info = {
-            'radar_id': "radar-pune",
-            'area_id': "area-1",
-            'frame_id': frame_id,
-            'timestamp': str(ist_timestamp),
-            'signal_strength': round(signal_strength, 2),
-            'range': round(range_, 2),
-            'speed': round(filtered_velocity, 2),
-            'aizmuth_angle': round(azimuth, 2),
-            'distance': round(range_, 2),
-            'direction': "Static" if velocity == 0 else "Incoming" if velocity > 0 else "Outgoing",
-            'classification': classification,
-            'zone': 0,
-            'x': round(x, 2),   
-            'y': round(y, 2),
-            'latitude': round(object_lat, 6),
-            'longitude': round(object_lon, 6),
-        }
-
-        targets.append(target_info)
-        targets_data.append(target_info)
-        
     if targets:
-        # Apply object tracking to the detected targets
-        tracked_targets = process_and_track_targets(targets, radar_tracker)
-        
         # for target in tracked_targets:
         #     print (target)
 
         # Publish tracked targets via MQTT if enabled
         if SEND_MQTT:
-            for target in tracked_targets:
-                publish_target(target)
+            start = time.perf_counter()
+            mqtt_publisher.publish_frame(tracked_targets)
+            publish_time.record(time.perf_counter() - start)
         
         # Display the tracked targets
         print(f"Frame ID: {frame_id}")
@@ -240,49 +162,103 @@ def parse_data_packet(data, frame_id):
         print("-" * 80)
         
         for idx, target in enumerate(tracked_targets, start=1):
-            track_id = target.get('track_id', 'New')
-            print(f"{idx:<6} {track_id:<10} {target['range']:<8.1f} {target['speed']:<8.1f} "
-                  f"{target['aizmuth_angle']:<8.1f} {target['tracked_classification']:<10} "
-                  f"{target['x']:<8.1f} {target['y']:<8.1f} {target['signal_strength']}")
+            track_id = target.track_id or 'New'
+            print(f"{idx:<6} {track_id:<10} {target.range:<8.1f} {target.speed:<8.1f} "
+                  f"{target.aizmuth_angle:<8.1f} {target.tracked_classification:<10} "
+                  f"{target.x:<8.1f} {target.y:<8.1f} {target.signal_strength}")
         
         print("-" * 80)
 
+# Parse Data Packet
+def parse_data_packet(data, frame_id, nr_of_targets=TARGETS_PER_PACKET, received_at=None):
+    # Decode and classify the targets, then apply object tracking
+    targets = radar_processor.detect(data, frame_id, nr_of_targets, received_at)
+    tracked_targets = radar_processor.track(targets, received_at)
+
+    output_targets(frame_id, targets, tracked_targets)
+
 
 # Process Packet
 def process_packet(header_data, data_packet):
-    detections, targets, data_packets, expected_checksum, bytes_per_target, frame_id = parse_header(header_data)
+    header = parse_header(header_data)
     
-    if targets is None:
+    if header is None:
         return
+
+    detections, targets, data_packets, expected_checksum, bytes_per_target, frame_id = header
     
     packet_data = header_data + data_packet
     calculated_checksum = calculate_checksum(data_packet, targets, bytes_per_target)
     
     if calculated_checksum != expected_checksum:
         # print(f"Checksum: Not Okay")
+        packet_checksum_failures.inc()
         return
     else:
         # print(f"Checksum: Okay")
-        parse_data_packet(data_packet, frame_id=frame_id)
-
-# Main Loop
-def main():
-    header_size = 256
-    data_packet_size = 1012
-    
-    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
-        sock.bind((LOCAL_IP, LOCAL_PORT))
-        print(f"Listening on {LOCAL_IP}:{LOCAL_PORT}...")
+        parse_data_packet(data_packet, frame_id=frame_id, nr_of_targets=min(targets, TARGETS_PER_PACKET))
+
+# Process a reassembled frame (header + all of its data packets)
+def process_frame(frame):
+    parse_data_packet(frame.data, frame_id=frame.frame_id, nr_of_targets=frame.nr_of_targets, received_at=frame.received_at)
+
+# Sink stage of the pipeline
+def pipeline_sink(result):
+    output_targets(result.frame.frame_id, result.targets, result.tracked_targets)
+
+# Receive, process and output on separate threads
+def run_pipeline():
+    global radar_pipeline
+    if REPLAY_FILE:
+        # Replayed frames are never dropped, the replay waits for processing instead
+        radar_pipeline = RadarPipeline(radar_processor, pipeline_sink, receiver=datagram_receiver, assembler=frame_assembler,
+                                       frame_queue_policy=BLOCK, result_queue_policy=BLOCK)
+    else:
+        radar_pipeline = RadarPipeline(radar_processor, pipeline_sink, receiver=datagram_receiver, assembler=frame_assembler)
+    radar_pipeline.start()
+    print(f"Replaying {REPLAY_FILE}..." if REPLAY_FILE else f"Listening on {LOCAL_IP}:{LOCAL_PORT}...")
+
+    # Runs until Ctrl+C, or until a replayed capture file is processed
+    next_report = time.monotonic() + PIPELINE_METRICS_INTERVAL
+    while radar_pipeline.is_running():
+        time.sleep(0.2)
+        if time.monotonic() < next_report:
+            continue
+        next_report += PIPELINE_METRICS_INTERVAL
+        metrics = radar_pipeline.get_metrics()
+        stages = ", ".join(f"{name} {stage['avg_ms']}/{stage['max_ms']} ms" for name, stage in metrics['stages'].items())
+        queues = ", ".join(f"{name} {q['depth']}/{q['capacity']} ({q['dropped']} dropped)" for name, q in metrics['queues'].items())
+        print(f"Pipeline avg/max: {stages} | queues: {queues}")
+
+# Receive and process on the main thread
+def receive_loop():
+    with datagram_receiver:
+        print(f"Replaying {REPLAY_FILE}..." if REPLAY_FILE else f"Listening on {LOCAL_IP}:{LOCAL_PORT}...")
         
-        while True:
-            header_data, addr = sock.recvfrom(header_size)
-            data_packet, addr = sock.recvfrom(data_packet_size)
-            if header_data and data_packet:
+        while not datagram_receiver.finished:
+            # Header and data packets are reassembled by frame ID and packet number
+            for datagram, received_at in datagram_receiver.receive_batch():
                 # print("Packet Received")
                 
-                process_packet(header_data, data_packet)
+                for frame in frame_assembler.add_datagram(datagram, received_at):
+                    process_frame(frame)
             # print("-" * 50)
-            
+
+# Main Loop
+def main():
+    global metrics_server
+    if METRICS_PORT is not None:
+        metrics_server = MetricsServer().start()
+
+    if USE_PIPELINE:
+        run_pipeline()
+    else:
+        receive_loop()
+    
+    # Live runs only get here when receiving stops without Ctrl+C
+    if REPLAY_FILE:
+        print("Replay finished")
+    shutdown()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,218 @@
+import mmap
+import socket
+import struct
+import time
+from config import *
+
+# File starts with CAPTURE_MAGIC, followed by one record per datagram:
+# receive time (float64 seconds, time.time()), datagram length (uint32), datagram bytes
+CAPTURE_MAGIC = b"ISYSCAP\x01"
+RECORD_HEADER = struct.Struct('<dI')
+
+
+class CaptureWriter:
+    def __init__(self, filename, buffer_size=1 << 20):
+        """
+        Write received datagrams with their receive time to a capture file
+
+        Args:
+            filename: Capture file, overwritten if it exists
+            buffer_size: Write buffer in bytes
+        """
+        self.filename = filename
+        self.file = open(filename, "wb", buffering=buffer_size)
+        self.file.write(CAPTURE_MAGIC)
+        self.datagrams_written = 0
+        self.bytes_written = len(CAPTURE_MAGIC)
+
+    def write(self, datagram, received_at):
+        self.file.write(RECORD_HEADER.pack(received_at, len(datagram)))
+        self.file.write(datagram)
+        self.datagrams_written += 1
+        self.bytes_written += RECORD_HEADER.size + len(datagram)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get_stats(self):
+        return {
+            'filename': self.filename,
+            'datagrams_written': self.datagrams_written,
+            'bytes_written': self.bytes_written,
+        }
+
+
+class CaptureReader:
+    def __init__(self, filename):
+        """
+        Memory-mapped capture file, iterating yields (memoryview, received_at) per datagram
+
+        The views point into the mapping, nothing is copied while reading.
+        """
+        self.filename = filename
+        self.file = open(filename, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(CAPTURE_MAGIC)] != CAPTURE_MAGIC:
+            self.close()
+            raise ValueError(f"{filename} is not a radar capture file")
+
+    def __iter__(self):
+        view = memoryview(self.map)
+        offset = len(CAPTURE_MAGIC)
+        while offset + RECORD_HEADER.size <= len(view):
+            received_at, length = RECORD_HEADER.unpack_from(view, offset)
+            offset += RECORD_HEADER.size
+            if offset + length > len(view):
+                # Last record cut off, e.g. capture was killed while writing
+                break
+            yield view[offset:offset + length], received_at
+            offset += length
+
+    def close(self):
+        try:
+            self.map.close()
+        except BufferError:
+            # Datagram views are still referenced, the mapping is released with them
+            pass
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class CaptureReceiver:
+    def __init__(self, filename=REPLAY_FILE, speed=REPLAY_SPEED, batch_size=RECEIVE_BATCH_SIZE):
+        """
+        Replays a capture file through the DatagramReceiver interface, so it can
+        replace the UDP socket in main.py or RadarPipeline
+
+        Args:
+            filename: Capture file written by CaptureWriter
+            speed: 1.0 replays in real time, N replays N times faster, 0 as fast as possible
+            batch_size: Maximum number of datagrams returned by one receive_batch call
+
+        Datagrams keep their original receive time, so frames and tracks are
+        timestamped as when they were captured, independent of the replay speed.
+        """
+        self.filename = filename
+        self.speed = speed
+        self.batch_size = batch_size
+        self.reader = None
+        self.records = None
+        self.next_record = None
+        self.first_timestamp = None
+        self.started = None
+        self.finished = False
+
+        self.datagrams_received = 0
+        self.bytes_received = 0
+        self.batches = 0
+
+    def open(self):
+        self.reader = CaptureReader(self.filename)
+        self.records = iter(self.reader)
+        self.finished = False
+        return self
+
+    def close(self):
+        if self.reader is not None:
+            self.records = None
+            self.next_record = None
+            self.reader.close()
+            self.reader = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def receive_batch(self, timeout=None):
+        """
+        Datagrams that are due according to the replay speed
+
+        Args:
+            timeout: Seconds to wait for the next datagram (None waits as long as needed)
+
+        Returns:
+            List of (memoryview, received_at) tuples, empty on timeout or at the end of the file
+        """
+        batch = []
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while len(batch) < self.batch_size:
+            if self.next_record is None:
+                self.next_record = next(self.records, None)
+                if self.next_record is None:
+                    self.finished = True
+                    break
+
+            datagram, received_at = self.next_record
+            if self.first_timestamp is None:
+                self.first_timestamp = received_at
+                self.started = time.monotonic()
+
+            if self.speed:
+                due = self.started + (received_at - self.first_timestamp) / self.speed
+                now = time.monotonic()
+                if due > now:
+                    if batch:
+                        # Return what is due, the rest comes with the next call
+                        break
+                    if deadline is not None and due > deadline:
+                        time.sleep(max(deadline - now, 0))
+                        break
+                    time.sleep(due - now)
+
+            batch.append((datagram, received_at))
+            self.next_record = None
+            self.datagrams_received += 1
+            self.bytes_received += len(datagram)
+
+        if batch:
+            self.batches += 1
+        return batch
+
+    def get_stats(self):
+        return {
+            'replay_file': self.filename,
+            'speed': self.speed,
+            'datagrams_received': self.datagrams_received,
+            'bytes_received': self.bytes_received,
+            'batches': self.batches,
+            'avg_batch_size': round(self.datagrams_received / self.batches, 2) if self.batches else 0,
+            'finished': self.finished,
+        }
+
+
+def replay_udp(filename=REPLAY_FILE, address=(LOCAL_IP, LOCAL_PORT), speed=REPLAY_SPEED):
+    """Send the datagrams of a capture file to address with their original timing (scaled by speed)"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    datagrams = 0
+    start = time.monotonic()
+    with CaptureReceiver(filename, speed=speed) as receiver:
+        while not receiver.finished:
+            for datagram, received_at in receiver.receive_batch():
+                sock.sendto(datagram, address)
+                datagrams += 1
+    sock.close()
+    return datagrams, time.monotonic() - start
+
+
+if __name__ == "__main__":
+    # Replay REPLAY_FILE to main.py listening on LOCAL_IP:LOCAL_PORT
+    if not REPLAY_FILE:
+        raise SystemExit("Set REPLAY_FILE in config.py to the capture file to replay")
+    print(f"Replaying {REPLAY_FILE} to {LOCAL_IP}:{LOCAL_PORT} at speed {REPLAY_SPEED or 'max'}...")
+    datagrams, elapsed = replay_udp()
+    print(f"Sent {datagrams} datagrams in {elapsed:.2f} s")
@@ -0,0 +1,85 @@
+import numpy as np
+from config import *
+
+
+class ClutterMap:
+    def __init__(self, max_range=MAX_RANGE, max_azimuth=MAX_AZIMUTH, range_resolution=CLUTTER_RANGE_RESOLUTION,
+                 azimuth_resolution=CLUTTER_AZIMUTH_RESOLUTION, velocity_threshold=CLUTTER_VELOCITY_THRESHOLD,
+                 threshold=CLUTTER_THRESHOLD, half_life=CLUTTER_HALF_LIFE):
+        """
+        Learned map of the range/azimuth cells that keep returning stationary targets (walls, poles, parked vehicles)
+
+        Every frame, each cell's score decays with half_life and gains 1 if the frame has a stationary
+        return in it. Stationary returns in cells whose score reached threshold are clutter. The score is
+        capped at twice the threshold, so a cell stops being clutter at most half_life seconds after its
+        stationary returns stop. Moving returns are never suppressed.
+
+        Args:
+            max_range, max_azimuth: Extent of the grid (m, +/- deg), returns outside it are kept
+            range_resolution, azimuth_resolution: Cell size (m, deg)
+            velocity_threshold: Returns with |velocity| up to this (m/s) count as stationary
+            threshold: Decayed frame count after which a cell is clutter
+            half_life: Seconds for a cell's score to halve
+        """
+        self.max_range = max_range
+        self.max_azimuth = max_azimuth
+        self.range_resolution = range_resolution
+        self.azimuth_resolution = azimuth_resolution
+        self.velocity_threshold = velocity_threshold
+        self.threshold = threshold
+        self.half_life = half_life
+
+        self.n_range = int(np.ceil(max_range / range_resolution))
+        self.n_azimuth = int(np.ceil(2 * max_azimuth / azimuth_resolution))
+        self.scores = np.zeros(self.n_range * self.n_azimuth, dtype=np.float32)
+        self.last_update = None
+
+        self.returns = 0
+        self.suppressed = 0
+
+    def cells(self, range_, azimuth):
+        """Flat cell index per return, -1 outside the grid"""
+        range_cell = np.floor(range_ / self.range_resolution).astype(np.intp)
+        azimuth_cell = np.floor((azimuth + self.max_azimuth) / self.azimuth_resolution).astype(np.intp)
+        inside = (range_cell >= 0) & (range_cell < self.n_range) & (azimuth_cell >= 0) & (azimuth_cell < self.n_azimuth)
+        return np.where(inside, range_cell * self.n_azimuth + azimuth_cell, -1)
+
+    def update(self, range_, velocity, azimuth, timestamp):
+        """
+        Learn the stationary returns of a frame and mark the clutter among them
+
+        Args:
+            range_, velocity, azimuth: Arrays with one value per return
+            timestamp: Frame time in seconds, the scores decay with the time between frames
+
+        Returns:
+            Boolean array, True for the returns to keep
+        """
+        if self.last_update is not None and timestamp > self.last_update:
+            self.scores *= np.float32(0.5 ** ((timestamp - self.last_update) / self.half_life))
+        self.last_update = timestamp
+
+        cells = self.cells(range_, azimuth)
+        stationary = (np.abs(velocity) <= self.velocity_threshold) & (cells >= 0)
+        # One hit per cell and frame, however many returns fall into it
+        hit_cells = np.unique(cells[stationary])
+        self.scores[hit_cells] = np.minimum(self.scores[hit_cells] + 1, 2 * self.threshold)
+
+        clutter = stationary & (self.scores[cells] >= self.threshold)
+        self.returns += len(cells)
+        self.suppressed += int(np.count_nonzero(clutter))
+        return ~clutter
+
+    def clutter_cells(self):
+        return int(np.count_nonzero(self.scores >= self.threshold))
+
+    def reset(self):
+        self.scores[:] = 0
+        self.last_update = None
+
+    def get_stats(self):
+        return {
+            'returns': self.returns,
+            'suppressed': self.suppressed,
+            'clutter_cells': self.clutter_cells(),
+        }
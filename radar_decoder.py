@@ -0,0 +1,243 @@
+import math
+import struct
+import numpy as np
+from functools import lru_cache
+from config import *
+
+# One target as sent by the radar: Signal Strength, Range, Velocity, Azimuth, Reserved1, Reserved2
+TARGET_DTYPE = np.dtype([
+    ('signal_strength', '<f4'),
+    ('range', '<f4'),
+    ('velocity', '<f4'),
+    ('azimuth', '<f4'),
+    ('reserved1', '<u4'),
+    ('reserved2', '<u4'),
+])
+TARGET_SIZE = TARGET_DTYPE.itemsize  # 24 bytes
+TARGETS_PER_PACKET = 42
+DATA_PACKET_PREFIX = 4  # frame ID + data packet number
+
+HEADER_FORMAT = '<HHHHHHIHH118x'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)  # 256 bytes
+DATA_PACKET_SIZE = DATA_PACKET_PREFIX + TARGETS_PER_PACKET * TARGET_SIZE  # 1012 bytes
+MAX_DATA_PACKETS = 7  # at most 256 targets per frame
+
+# Parameters of the velocity smoothing filter (same defaults as main.KalmanFilter)
+VELOCITY_PROCESS_NOISE = 1e-5
+VELOCITY_MEASUREMENT_NOISE = 0.1
+VELOCITY_INITIAL_ERROR = 1
+
+# Meters per degree of latitude used for the lat/long projection
+METERS_PER_DEGREE = 111139
+
+
+# Parse Header
+def parse_header(data):
+    if len(data) < HEADER_SIZE:
+        print("Incomplete header data.")
+        return None
+    
+    frame_id, fw_major, fw_fix, fw_minor, detections, targets, checksum, bytes_per_target, data_packets = struct.unpack(
+        HEADER_FORMAT, data[:HEADER_SIZE]
+    )
+
+    # print(f"Frame ID: {frame_id}")
+    # print(f"Number of Targets: {targets}")
+    
+    return detections, targets, data_packets, checksum, bytes_per_target, frame_id
+
+
+def calculate_checksum(data, nrOfTargets, bytesPerTarget):
+    """
+    Byte-wise sum over the targets of a data packet, truncated to 32 bit
+
+    Same result as summing data[4:] byte by byte. If the packet is shorter
+    than nrOfTargets * bytesPerTarget, the available bytes are summed and a
+    warning is printed.
+    """
+    length = nrOfTargets * bytesPerTarget
+    target_list = np.frombuffer(data, dtype=np.uint8)[DATA_PACKET_PREFIX:]
+
+    if length > len(target_list):
+        print("Warning: Index out of range while calculating checksum. Ignoring and continuing...")
+        length = len(target_list)
+
+    return int(target_list[:length].sum(dtype=np.uint64)) & 0xFFFFFFFF
+
+
+def _calculate_checksum_loop(data, nrOfTargets, bytesPerTarget):
+    """Byte-by-byte reference implementation of calculate_checksum"""
+    target_list = data[DATA_PACKET_PREFIX:]
+    checksum = 0
+
+    try:
+        for i in range(nrOfTargets * bytesPerTarget):
+            checksum += target_list[i]
+            checksum &= 0xFFFFFFFF
+
+    except IndexError:
+         print("Warning: Index out of range while calculating checksum. Ignoring and continuing...")
+
+    return checksum
+
+
+def decode_targets(data, max_targets=TARGETS_PER_PACKET):
+    """
+    View the targets of a data packet as a structured array (zero-copy)
+
+    Args:
+        data: Data packet including the 4 byte frame ID / packet number prefix
+        max_targets: Maximum number of targets to decode
+
+    Returns:
+        Read-only NumPy array with TARGET_DTYPE, one row per complete target
+    """
+    available = max(len(data) - DATA_PACKET_PREFIX, 0) // TARGET_SIZE
+    count = min(max_targets, available)
+    if count <= 0:
+        return np.empty(0, dtype=TARGET_DTYPE)
+    return np.frombuffer(data, dtype=TARGET_DTYPE, count=count, offset=DATA_PACKET_PREFIX)
+
+
+@lru_cache(maxsize=None)
+def velocity_filter_weights(n, process_noise=VELOCITY_PROCESS_NOISE,
+                            measurement_noise=VELOCITY_MEASUREMENT_NOISE,
+                            error_estimate=VELOCITY_INITIAL_ERROR):
+    """
+    Weights that apply the scalar Kalman filter of main.KalmanFilter to n
+    measurements in one matrix product.
+
+    The gain sequence of that filter does not depend on the measurements, so the
+    filtered value i is a fixed linear combination of measurements 0..i.
+    """
+    gains = np.empty(n)
+    for k in range(n):
+        error_estimate += process_noise
+        gains[k] = error_estimate / (error_estimate + measurement_noise)
+        error_estimate *= 1 - gains[k]
+
+    weights = np.zeros((n, n))
+    for i in range(n):
+        decay = 1.0
+        for k in range(i, -1, -1):
+            weights[i, k] = gains[k] * decay
+            decay *= 1 - gains[k]
+
+    weights.flags.writeable = False
+    return weights
+
+
+def compute_target_columns(targets, radar_lat=RADAR_LAT, radar_long=RADAR_LONG):
+    """
+    Compute the derived target values as column operations
+
+    Args:
+        targets: Structured array returned by decode_targets
+        radar_lat: Radar latitude in degrees
+        radar_long: Radar longitude in degrees
+
+    Returns:
+        Dict of float64 / str arrays, one entry per target
+    """
+    signal_strength = targets['signal_strength'].astype(np.float64)
+    range_ = targets['range'].astype(np.float64)
+    velocity = targets['velocity'].astype(np.float64)
+    azimuth = targets['azimuth'].astype(np.float64)
+
+    # Apply Kalman filter for velocity tracking
+    filtered_velocity = velocity_filter_weights(len(targets)) @ velocity
+
+    # Calculate the x and y position of the targets
+    azimuth_angle_radians = np.radians(azimuth)
+    x = range_ * np.cos(azimuth_angle_radians)
+    y = range_ * np.sin(azimuth_angle_radians)
+
+    # Calculate the latitude and longitude of the objects
+    latitude = radar_lat + y / METERS_PER_DEGREE
+    longitude = radar_long + x / (METERS_PER_DEGREE * math.cos(math.radians(radar_lat)))
+
+    direction = np.where(velocity == 0, "Static", np.where(velocity > 0, "Incoming", "Outgoing"))
+
+    return {
+        'signal_strength': signal_strength,
+        'range': range_,
+        'velocity': velocity,
+        'speed': filtered_velocity,
+        'azimuth': azimuth,
+        'direction': direction,
+        'x': x,
+        'y': y,
+        'latitude': latitude,
+        'longitude': longitude,
+    }
+
+
+class TargetRecord:
+    """
+    One detected target
+
+    Targets stay records through classification, tracking and output,
+    to_dict() is only called where they are serialized (JSON, MQTT, file).
+    """
+
+    __slots__ = ('radar_id', 'area_id', 'frame_id', 'timestamp', 'signal_strength', 'range', 'speed', 'aizmuth_angle',
+                 'distance', 'direction', 'classification', 'zone', 'x', 'y', 'latitude', 'longitude')
+
+    def __init__(self, radar_id, area_id, frame_id, timestamp, signal_strength, range, speed, aizmuth_angle,
+                 distance, direction, classification, zone, x, y, latitude, longitude):
+        self.radar_id = radar_id
+        self.area_id = area_id
+        self.frame_id = frame_id
+        self.timestamp = timestamp
+        self.signal_strength = signal_strength
+        self.range = range
+        self.speed = speed
+        self.aizmuth_angle = aizmuth_angle
+        self.distance = distance
+        self.direction = direction
+        self.classification = classification
+        self.zone = zone
+        self.x = x
+        self.y = y
+        self.latitude = latitude
+        self.longitude = longitude
+
+    def to_dict(self):
+        return {
+            'radar_id': self.radar_id,
+            'area_id': self.area_id,
+            'frame_id': self.frame_id,
+            'timestamp': self.timestamp,
+            'signal_strength': self.signal_strength,
+            'range': self.range,
+            'speed': self.speed,
+            'aizmuth_angle': self.aizmuth_angle,
+            'distance': self.distance,
+            'direction': self.direction,
+            'classification': self.classification,
+            'zone': self.zone,
+            'x': self.x,
+            'y': self.y,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+        }
+
+
+def build_target_records(columns, classifications, frame_id, timestamp, radar_id, area_id):
+    """Build the TargetRecords used by the tracker and the sinks"""
+    signal_strength = np.round(columns['signal_strength'], 2).tolist()
+    range_ = np.round(columns['range'], 2).tolist()
+    speed = np.round(columns['speed'], 2).tolist()
+    azimuth = np.round(columns['azimuth'], 2).tolist()
+    x = np.round(columns['x'], 2).tolist()
+    y = np.round(columns['y'], 2).tolist()
+    latitude = np.round(columns['latitude'], 6).tolist()
+    longitude = np.round(columns['longitude'], 6).tolist()
+    direction = columns['direction'].tolist()
+
+    return [
+        TargetRecord(radar_id, area_id, frame_id, timestamp, signal_strength[i], range_[i], speed[i], azimuth[i],
+                     range_[i], direction[i], classifications[i], 0, x[i], y[i], latitude[i], longitude[i])
+        for i in range(len(signal_strength))
+    ]
+
@@ -0,0 +1,240 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import *
+
+# Upper bounds (seconds) of the histogram buckets exposed on /metrics
+PROMETHEUS_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class LatencyHistogram:
+    def __init__(self, sub_bucket_bits=6, max_value=60.0):
+        """
+        HDR-style latency histogram with a fixed number of buckets
+
+        Values are recorded in microseconds. Below 2**sub_bucket_bits µs every value has
+        its own bucket, above that every power of two is split into 2**(sub_bucket_bits-1)
+        buckets, so the relative error stays below 2**-(sub_bucket_bits-1) (about 3%).
+        record() is a few integer operations and one list increment.
+
+        Args:
+            sub_bucket_bits: Precision, see above
+            max_value: Largest value in seconds, larger values are counted as max_value
+        """
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.half_count = self.sub_bucket_count // 2
+        self.max_us = int(max_value * 1e6)
+        self.counts = [0] * (self._index(self.max_us) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def _index(self, value_us):
+        shift = value_us.bit_length() - self.sub_bucket_bits
+        if shift <= 0:
+            return value_us
+        return shift * self.half_count + (value_us >> shift)
+
+    def _upper_bound_us(self, index):
+        """Largest value (µs) that falls into the bucket"""
+        if index < self.sub_bucket_count:
+            return index
+        shift = (index - self.half_count) // self.half_count
+        sub_bucket = index - shift * self.half_count
+        return ((sub_bucket + 1) << shift) - 1
+
+    def record(self, seconds):
+        value_us = int(seconds * 1e6)
+        if value_us > self.max_us:
+            value_us = self.max_us
+        elif value_us < 0:
+            value_us = 0
+        self.counts[self._index(value_us)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """Upper bound (seconds) of the bucket holding the q-th percentile (0-100)"""
+        if not self.count:
+            return 0.0
+        rank = max(int(self.count * q / 100.0 + 0.5), 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self._upper_bound_us(index) / 1e6, self.max)
+        return self.max
+
+    def cumulative_counts(self, bounds=PROMETHEUS_BUCKETS):
+        """Number of values <= each bound (seconds), for Prometheus buckets"""
+        cumulative = []
+        seen = 0
+        index = 0
+        for bound in bounds:
+            bound_us = bound * 1e6
+            while index < len(self.counts) and self._upper_bound_us(index) <= bound_us:
+                seen += self.counts[index]
+                index += 1
+            cumulative.append(seen)
+        return cumulative
+
+    def get_metrics(self):
+        return {
+            'count': self.count,
+            'avg_ms': round(self.sum / self.count * 1e3, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(50) * 1e3, 3),
+            'p99_ms': round(self.percentile(99) * 1e3, 3),
+            'p999_ms': round(self.percentile(99.9) * 1e3, 3),
+            'max_ms': round(self.max * 1e3, 3),
+        }
+
+
+class Counter:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in sorted(labels.items())) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        Counters, gauges and latency histograms of one process
+
+        Metrics are identified by name and labels. Registering one again replaces it, for counters,
+        histograms and gauges alike, so a component created again (e.g. a RadarProcessor for the same
+        radar) exports only its own values. Modules look up their metrics once and update them on the hot path.
+        """
+        self.lock = threading.Lock()
+        self.metrics = {}  # (name, labels) -> (kind, help, Counter / LatencyHistogram / callable)
+
+    def _register(self, kind, name, help_text, labels, metric):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.metrics[key] = (kind, help_text, metric)
+        return metric
+
+    def counter(self, name, help_text="", **labels):
+        return self._register("counter", name, help_text, labels, Counter())
+
+    def histogram(self, name, help_text="", **labels):
+        return self._register("histogram", name, help_text, labels, LatencyHistogram())
+
+    def gauge(self, name, function, help_text="", kind="gauge", **labels):
+        """Value read from function() at export time, kind "counter" for cumulative counts kept elsewhere"""
+        self._register(kind, name, help_text, labels, function)
+
+    def render_prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self.lock:
+            items = sorted(self.metrics.items(), key=lambda item: item[0])
+
+        lines = []
+        described = set()
+        for (name, labels), (kind, help_text, metric) in items:
+            labels = dict(labels)
+            if name not in described:
+                described.add(name)
+                if help_text:
+                    lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+            if kind == "histogram":
+                for bound, count in zip(PROMETHEUS_BUCKETS, metric.cumulative_counts()):
+                    lines.append(f"{name}_bucket{_format_labels(dict(labels, le=bound))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(dict(labels, le='+Inf'))} {metric.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {metric.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {metric.count}")
+            else:
+                value = metric.value if isinstance(metric, Counter) else metric()
+                if value is None:
+                    continue
+                lines.append(f"{name}{_format_labels(labels)} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+    def get_metrics(self):
+        """All metrics as dict, histograms summarized (count, avg, p50, p99, p99.9, max)"""
+        with self.lock:
+            items = list(self.metrics.items())
+        result = {}
+        for (name, labels), (kind, _, metric) in items:
+            key = name + _format_labels(dict(labels))
+            if kind == "histogram":
+                result[key] = metric.get_metrics()
+            else:
+                result[key] = metric.value if isinstance(metric, Counter) else metric()
+        return result
+
+
+# Registry of this process, used by the processing modules
+METRICS = MetricsRegistry()
+
+
+class MetricsServer:
+    def __init__(self, registry=METRICS, host=METRICS_HOST, port=METRICS_PORT):
+        """HTTP endpoint serving GET /metrics (Prometheus text format) from a background thread"""
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # No log line per scrape
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True)
+        self.thread.start()
+        print(f"Metrics endpoint on http://{self.host}:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+if __name__ == "__main__":
+    # Histogram accuracy and record() overhead
+    import random
+    histogram = LatencyHistogram()
+    values = [random.lognormvariate(-6, 1.5) for _ in range(200000)]
+    start = time.perf_counter()
+    for value in values:
+        histogram.record(value)
+    elapsed = time.perf_counter() - start
+    values.sort()
+    for q in (50, 99, 99.9):
+        exact = values[max(int(len(values) * q / 100.0 + 0.5), 1) - 1]
+        print(f"p{q}: histogram {histogram.percentile(q) * 1e3:.4f} ms, exact {exact * 1e3:.4f} ms")
+    print(f"record(): {elapsed / len(values) * 1e9:.0f} ns per value, {len(histogram.counts)} buckets")
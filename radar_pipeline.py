@@ -0,0 +1,239 @@
+import queue
+import threading
+import time
+from frame_reassembly import FrameAssembler
+from udp_receiver import DatagramReceiver
+from radar_metrics import METRICS
+from config import *
+
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+
+
+class BoundedQueue:
+    def __init__(self, name, maxsize, overflow_policy=DROP_OLDEST):
+        """
+        queue.Queue with a fixed size and an overflow policy
+
+        Args:
+            name: Name used in the metrics
+            maxsize: Maximum number of queued items
+            overflow_policy: DROP_OLDEST discards the oldest item to make room,
+                BLOCK makes the producer wait (back-pressure)
+        """
+        if overflow_policy not in (DROP_OLDEST, BLOCK):
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+
+        self.name = name
+        self.overflow_policy = overflow_policy
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.items_put = 0
+        self.items_dropped = 0
+        self.max_depth = 0
+
+    def put(self, item, stop_event=None):
+        if self.overflow_policy == BLOCK:
+            while True:
+                try:
+                    self.queue.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    if stop_event is not None and stop_event.is_set():
+                        return
+        else:
+            while True:
+                try:
+                    self.queue.put_nowait(item)
+                    break
+                except queue.Full:
+                    try:
+                        self.queue.get_nowait()
+                        self.items_dropped += 1
+                    except queue.Empty:
+                        pass
+
+        self.items_put += 1
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    def get(self, timeout=None):
+        """Next item, or None after timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def get_metrics(self):
+        return {
+            'depth': self.queue.qsize(),
+            'max_depth': self.max_depth,
+            'capacity': self.queue.maxsize,
+            'policy': self.overflow_policy,
+            'put': self.items_put,
+            'dropped': self.items_dropped,
+        }
+
+
+class StageMetrics:
+    """Item count and processing latency of one pipeline stage, exported on /metrics as histogram"""
+
+    def __init__(self, name, radar_id=RADAR_ID):
+        self.name = name
+        self.histogram = METRICS.histogram("radar_pipeline_stage_seconds", "Time per item and pipeline stage",
+                                           radar=radar_id, stage=name)
+        self.items = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.last_time = 0.0
+
+    def record(self, elapsed):
+        self.histogram.record(elapsed)
+        self.items += 1
+        self.total_time += elapsed
+        self.last_time = elapsed
+        if elapsed > self.max_time:
+            self.max_time = elapsed
+
+    def get_metrics(self):
+        return {
+            'items': self.items,
+            'avg_ms': round(self.total_time / self.items * 1e3, 3) if self.items else 0.0,
+            'p99_ms': round(self.histogram.percentile(99) * 1e3, 3),
+            'max_ms': round(self.max_time * 1e3, 3),
+            'last_ms': round(self.last_time * 1e3, 3),
+        }
+
+
+class PipelineResult:
+    """Output of the processing stage for one frame"""
+
+    __slots__ = ('frame', 'targets', 'tracked_targets')
+
+    def __init__(self, frame, targets, tracked_targets):
+        self.frame = frame
+        self.targets = targets
+        self.tracked_targets = tracked_targets
+
+
+class RadarPipeline:
+    def __init__(self, processor, sink, receiver=None, assembler=None,
+                 frame_queue_size=FRAME_QUEUE_SIZE, frame_queue_policy=FRAME_QUEUE_POLICY,
+                 result_queue_size=RESULT_QUEUE_SIZE, result_queue_policy=RESULT_QUEUE_POLICY):
+        """
+        Receiver, decode/classify/track worker and sink worker connected by bounded queues
+
+        Args:
+            processor: RadarProcessor used by the processing stage
+            sink: Callable taking a PipelineResult (publish, display, record ...)
+            receiver: DatagramReceiver (or CaptureReceiver), a new one is created if not given.
+                When it is finished, the remaining frames are processed and the pipeline stops.
+            assembler: FrameAssembler, a new one is created if not given
+            frame_queue_size, frame_queue_policy: Queue between receiver and processing
+            result_queue_size, result_queue_policy: Queue between processing and sink
+        """
+        self.processor = processor
+        self.sink = sink
+        self.receiver = receiver if receiver is not None else DatagramReceiver()
+        self.assembler = assembler if assembler is not None else FrameAssembler(radar_id=processor.radar_id)
+
+        self.frame_queue = BoundedQueue("frames", frame_queue_size, frame_queue_policy)
+        self.result_queue = BoundedQueue("results", result_queue_size, result_queue_policy)
+
+        radar_id = processor.radar_id
+        self.receive_metrics = StageMetrics("receive", radar_id)
+        self.process_metrics = StageMetrics("process", radar_id)
+        self.sink_metrics = StageMetrics("sink", radar_id)
+        self.end_to_end_metrics = StageMetrics("end_to_end", radar_id)
+        for bounded_queue in (self.frame_queue, self.result_queue):
+            METRICS.gauge("radar_frames_dropped_total", lambda bounded_queue=bounded_queue: bounded_queue.items_dropped,
+                          "Frames dropped", kind="counter", radar=radar_id, reason=f"{bounded_queue.name}_queue")
+            METRICS.gauge("radar_queue_depth", bounded_queue.queue.qsize, "Items waiting in a pipeline queue",
+                          radar=radar_id, queue=bounded_queue.name)
+
+        self.stop_event = threading.Event()
+        self.receive_done = threading.Event()
+        self.process_done = threading.Event()
+        self.threads = []
+
+    def start(self):
+        self.receiver.open()
+        self.stop_event.clear()
+        self.receive_done.clear()
+        self.process_done.clear()
+        self.threads = [
+            threading.Thread(target=self._receive_loop, name="radar-receiver", daemon=True),
+            threading.Thread(target=self._process_loop, name="radar-processor", daemon=True),
+            threading.Thread(target=self._sink_loop, name="radar-sink", daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+        self.receiver.close()
+
+    def is_running(self):
+        return any(thread.is_alive() for thread in self.threads)
+
+    def _receive_loop(self):
+        while not self.stop_event.is_set() and not self.receiver.finished:
+            batch = self.receiver.receive_batch(timeout=0.2)
+            start = time.perf_counter()
+            for datagram, received_at in batch:
+                for frame in self.assembler.add_datagram(datagram, received_at):
+                    self.frame_queue.put(frame, self.stop_event)
+            if batch:
+                self.receive_metrics.record(time.perf_counter() - start)
+        self.receive_done.set()
+
+    def _process_loop(self):
+        while not self.stop_event.is_set():
+            frame = self.frame_queue.get(timeout=0.2)
+            if frame is None:
+                # receive_done is set after the last put, so an empty queue then means nothing is left
+                if self.receive_done.is_set() and self.frame_queue.queue.empty():
+                    break
+                continue
+            start = time.perf_counter()
+            try:
+                targets, tracked_targets = self.processor.process_frame(frame)
+            except Exception as e:
+                print(f"Processing failed for frame {frame.frame_id}: {e}")
+                continue
+            self.process_metrics.record(time.perf_counter() - start)
+            self.result_queue.put(PipelineResult(frame, targets, tracked_targets), self.stop_event)
+        self.process_done.set()
+
+    def _sink_loop(self):
+        while not self.stop_event.is_set():
+            result = self.result_queue.get(timeout=0.2)
+            if result is None:
+                if self.process_done.is_set() and self.result_queue.queue.empty():
+                    break
+                continue
+            start = time.perf_counter()
+            try:
+                self.sink(result)
+            except Exception as e:
+                print(f"Sink failed for frame {result.frame.frame_id}: {e}")
+            self.sink_metrics.record(time.perf_counter() - start)
+            # Receive timestamps are wall clock (time.time)
+            self.end_to_end_metrics.record(time.time() - result.frame.received_at)
+
+    def get_metrics(self):
+        """Per-stage latency, queue depths and receiver/reassembly counters"""
+        return {
+            'stages': {
+                metrics.name: metrics.get_metrics()
+                for metrics in (self.receive_metrics, self.process_metrics, self.sink_metrics, self.end_to_end_metrics)
+            },
+            'queues': {
+                bounded_queue.name: bounded_queue.get_metrics()
+                for bounded_queue in (self.frame_queue, self.result_queue)
+            },
+            'receiver': self.receiver.get_stats(),
+            'reassembly': self.assembler.get_stats(),
+        }
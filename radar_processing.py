@@ -0,0 +1,116 @@
+import time
+import pytz
+from datetime import datetime
+from radar_decoder import decode_targets, compute_target_columns, build_target_records, TARGETS_PER_PACKET
+from radar_tracking import RadarTracker, process_and_track_targets
+from radar_clutter import ClutterMap
+from Classification.CLASSIFICATION_PIPELINE import classification_pipeline_batch
+from radar_metrics import METRICS
+from config import *
+
+ist_timezone = pytz.timezone('Asia/Kolkata')
+
+
+class RadarProcessor:
+    def __init__(self, radar_id=RADAR_ID, area_id=AREA_ID, radar_lat=RADAR_LAT, radar_long=RADAR_LONG, tracker=None, clutter_map=None):
+        """
+        Decode, classify and track the frames of one radar
+
+        Args:
+            radar_id, area_id: Identifiers written into every target
+            radar_lat, radar_long: Radar position used for the target latitude/longitude
+            tracker: RadarTracker instance, a new one is created if not given. Detections are classified
+                by the tracker per track when it has a classifier (TRACK_CLASSIFICATION_INTERVAL), in detect otherwise.
+            clutter_map: ClutterMap instance, a new one is created if not given and CLUTTER_MAP is set
+        """
+        self.radar_id = radar_id
+        self.area_id = area_id
+        self.radar_lat = radar_lat
+        self.radar_long = radar_long
+        if tracker is None:
+            classifier = classification_pipeline_batch if TRACK_CLASSIFICATION_INTERVAL else None
+            tracker = RadarTracker(max_distance=5.0, max_age=3, hit_threshold=2, classifier=classifier)
+        self.tracker = tracker
+        if clutter_map is None and CLUTTER_MAP:
+            clutter_map = ClutterMap()
+        self.clutter_map = clutter_map
+
+        # Per-stage latency and counters, exported on /metrics
+        stage_help = "Processing time per frame and stage"
+        self.decode_time = METRICS.histogram("radar_stage_seconds", stage_help, radar=radar_id, stage="decode")
+        self.classify_time = METRICS.histogram("radar_stage_seconds", stage_help, radar=radar_id, stage="classify")
+        self.records_time = METRICS.histogram("radar_stage_seconds", stage_help, radar=radar_id, stage="records")
+        self.track_time = METRICS.histogram("radar_stage_seconds", stage_help, radar=radar_id, stage="track")
+        self.frame_time = METRICS.histogram("radar_frame_processing_seconds", "Decode to tracking time per frame", radar=radar_id)
+        self.frames = METRICS.counter("radar_frames_total", "Frames processed", radar=radar_id)
+        self.targets = METRICS.counter("radar_targets_total", "Targets detected", radar=radar_id)
+        METRICS.gauge("radar_tracks", lambda: len(self.tracker.tracks), "Active tracks", radar=radar_id)
+        METRICS.gauge("radar_classifications_total", lambda: self.tracker.detections_classified,
+                      "Detections classified per track, by the model or from the track's last label", kind="counter", radar=radar_id, source="model")
+        METRICS.gauge("radar_classifications_total", lambda: self.tracker.classifications_cached,
+                      "Detections classified per track, by the model or from the track's last label", kind="counter", radar=radar_id, source="track_cache")
+        if clutter_map is not None:
+            METRICS.gauge("radar_clutter_suppressed_total", lambda: self.clutter_map.suppressed,
+                          "Stationary returns dropped by the clutter map", kind="counter", radar=radar_id)
+            METRICS.gauge("radar_clutter_cells", self.clutter_map.clutter_cells, "Range/azimuth cells marked as clutter", radar=radar_id)
+        # Compare with radar_frame_processing_seconds to see processing getting close to the frame period
+        METRICS.gauge("radar_frame_interval_seconds", lambda: self.tracker.dt, "Time between the last two frames", radar=radar_id)
+
+    def detect(self, data, frame_id, nr_of_targets=TARGETS_PER_PACKET, received_at=None):
+        """Decode and classify the targets of a frame, returns a list of TargetRecords"""
+        start = time.perf_counter()
+        # Signal Strength, Range, Velocity, Azimuth, Reserved1, Reserved2 for each target in the frame
+        target_array = decode_targets(data, max_targets=nr_of_targets)
+
+        # Drop stationary returns in learned clutter cells before anything else is computed for them
+        if self.clutter_map is not None and len(target_array):
+            keep = self.clutter_map.update(target_array['range'], target_array['velocity'], target_array['azimuth'],
+                                           time.time() if received_at is None else received_at)
+            if not keep.all():
+                target_array = target_array[keep]
+
+        # # Filter targets below signal strength threshold
+        # if signal_strength < SIGNAL_STRENGTH_THRESHOLD:
+        #     continue
+
+        # Filtered velocity, x/y and latitude/longitude for all targets at once
+        columns = compute_target_columns(target_array, self.radar_lat, self.radar_long)
+        decoded = time.perf_counter()
+
+        if self.tracker.classifier is None:
+            # One predict call for the whole frame, uav/bicycle already remapped
+            classifications = classification_pipeline_batch(columns['range'], columns['speed'], columns['azimuth']).tolist()
+        else:
+            # Classified per track in track()
+            classifications = [None] * len(columns['range'])
+        classified = time.perf_counter()
+
+        # Capture time of the frame, so replayed frames keep their original timestamps
+        ist_timestamp = datetime.now(ist_timezone) if received_at is None else datetime.fromtimestamp(received_at, ist_timezone)
+
+        targets = build_target_records(columns, classifications, frame_id, str(ist_timestamp), self.radar_id, self.area_id)
+        end = time.perf_counter()
+
+        self.decode_time.record(decoded - start)
+        self.classify_time.record(classified - decoded)
+        self.records_time.record(end - classified)
+        self.frames.inc()
+        self.targets.inc(len(targets))
+        return targets
+
+    def track(self, targets, received_at=None):
+        """Apply object tracking to the detected targets, returns the TrackedTargets"""
+        if not targets:
+            return []
+        start = time.perf_counter()
+        tracked_targets = process_and_track_targets(targets, self.tracker, received_at)
+        self.track_time.record(time.perf_counter() - start)
+        return tracked_targets
+
+    def process_frame(self, frame):
+        """Detect and track a reassembled RadarFrame, returns (targets, tracked_targets)"""
+        start = time.perf_counter()
+        targets = self.detect(frame.data, frame.frame_id, frame.nr_of_targets, frame.received_at)
+        tracked_targets = self.track(targets, frame.received_at)
+        self.frame_time.record(time.perf_counter() - start)
+        return targets, tracked_targets
@@ -0,0 +1,206 @@
+import json
+import threading
+import time
+from collections import Counter
+from config import *
+
+# Optional faster encoders, the standard json module is used without them
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+TARGET_MODE = "target"
+FRAME_MODE = "frame"
+
+JSON_ENCODING = "json"
+MSGPACK_ENCODING = "msgpack"
+COLUMNAR_ENCODING = "columnar"
+
+# Sent once per frame in frame mode. Targets of tracks that were not updated by the frame
+# still carry their last detection's values, those targets keep their own.
+FRAME_KEYS = ('radar_id', 'area_id', 'frame_id', 'timestamp')
+# Keys TrackedTarget.to_dict() only includes when set
+OPTIONAL_KEYS = ('predicted_x', 'predicted_y', 'time_to_closest_approach')
+# None in a column means the key is absent for that target
+SPARSE_KEYS = FRAME_KEYS + OPTIONAL_KEYS
+
+
+def encode_json(message):
+    if orjson is not None:
+        return orjson.dumps(message)
+    return json.dumps(message, separators=(',', ':')).encode()
+
+
+def frame_entry(tracked_targets, columnar=False):
+    """
+    Frame keys once, followed by the tracked targets without them
+
+    Args:
+        tracked_targets: TrackedTargets of one frame (at least one)
+        columnar: Targets as one list per key ("columns") instead of one dict per target ("targets")
+    """
+    targets = [target.to_dict() for target in tracked_targets]
+    frame_values = Counter(tuple(target[key] for key in FRAME_KEYS) for target in targets).most_common(1)[0][0]
+    entry = dict(zip(FRAME_KEYS, frame_values))
+    for target in targets:
+        for key, value in zip(FRAME_KEYS, frame_values):
+            if target[key] == value:
+                del target[key]
+
+    if not columnar:
+        entry['targets'] = targets
+        return entry
+
+    # Union of the keys of all targets, in order of appearance. Keys missing in a target
+    # (optional keys, frame keys equal to the frame's) are None
+    keys = list(dict.fromkeys(key for target in targets for key in target))
+    entry['columns'] = {key: [target.get(key) for target in targets] for key in keys}
+    return entry
+
+
+def decode_message(payload, mode=MQTT_PUBLISH_MODE, encoding=MQTT_ENCODING):
+    """
+    Tracked target dicts of a received message, the inverse of FramePublisher
+
+    Returns:
+        List of dicts with the same keys as TrackedTarget.to_dict()
+    """
+    if mode == TARGET_MODE:
+        return [json.loads(payload)]
+
+    message = msgpack.unpackb(payload) if encoding == MSGPACK_ENCODING else json.loads(payload)
+    targets = []
+    for entry in message['frames']:
+        frame = {key: entry[key] for key in FRAME_KEYS}
+        if 'columns' in entry:
+            columns = entry['columns']
+            rows = zip(*columns.values())
+            entry_targets = [
+                {key: value for key, value in zip(columns, row) if value is not None or key not in SPARSE_KEYS}
+                for row in rows
+            ]
+        else:
+            entry_targets = entry['targets']
+        targets.extend(dict(frame, **target) for target in entry_targets)
+    return targets
+
+
+class FramePublisher:
+    def __init__(self, send, mode=MQTT_PUBLISH_MODE, encoding=MQTT_ENCODING, qos=MQTT_QOS, batch_window=MQTT_BATCH_WINDOW):
+        """
+        Publish tracked targets one message per target, or one message per frame (or batching window)
+
+        Args:
+            send: Callable taking (payload, qos), e.g. a paho client's publish bound to the channel
+            mode: TARGET_MODE sends json.dumps(target) per target as before,
+                FRAME_MODE sends {"frames": [...]} with the frame keys once per frame
+            encoding: Frame mode payload: JSON_ENCODING (orjson when installed), MSGPACK_ENCODING
+                or COLUMNAR_ENCODING (JSON, one list per key instead of one dict per target)
+            qos: MQTT quality of service of the published messages
+            batch_window: Frame mode only, seconds of frames collected into one message (0 sends every frame).
+                A background thread sends a window once it ends, also when no further frames have targets.
+        """
+        if mode not in (TARGET_MODE, FRAME_MODE):
+            raise ValueError(f"Unknown MQTT publish mode: {mode}")
+        if encoding not in (JSON_ENCODING, MSGPACK_ENCODING, COLUMNAR_ENCODING):
+            raise ValueError(f"Unknown MQTT encoding: {encoding}")
+        if mode == FRAME_MODE and encoding == MSGPACK_ENCODING and msgpack is None:
+            raise ImportError("MQTT_ENCODING = \"msgpack\" needs the msgpack package (pip install msgpack)")
+
+        self.send = send
+        self.mode = mode
+        self.encoding = encoding
+        self.qos = qos
+        self.batch_window = batch_window
+        self.batch = []
+        self.batch_targets = 0
+        self.batch_started = None
+        # Reentrant, a signal handler may flush while the same thread publishes
+        self.lock = threading.RLock()
+        self.stop_event = threading.Event()
+        self.flush_thread = None
+
+        self.messages_published = 0
+        self.targets_published = 0
+        self.bytes_published = 0
+        self.publish_errors = 0
+
+    def publish_frame(self, tracked_targets):
+        """Publish (or batch) the tracked targets of one frame"""
+        if self.mode == TARGET_MODE:
+            for target in tracked_targets:
+                self._send(json.dumps(target.to_dict()), 1)
+            return
+
+        with self.lock:
+            if tracked_targets:
+                self.batch.append(frame_entry(tracked_targets, columnar=self.encoding == COLUMNAR_ENCODING))
+                self.batch_targets += len(tracked_targets)
+                if self.batch_started is None:
+                    self.batch_started = time.monotonic()
+            # Frames without targets also end a window
+            if self._window_ended():
+                self.flush()
+            if self.flush_thread is None and self.batch_window > 0:
+                self.flush_thread = threading.Thread(target=self._flush_loop, name="mqtt-batch-flush", daemon=True)
+                self.flush_thread.start()
+
+    def _window_ended(self):
+        return self.batch_started is not None and time.monotonic() - self.batch_started >= self.batch_window
+
+    def _flush_loop(self):
+        # Sends the last window when the scene empties and no frames have targets any more
+        while not self.stop_event.wait(self.batch_window / 4):
+            with self.lock:
+                if self._window_ended():
+                    self.flush()
+
+    def flush(self):
+        """Send the frames collected so far"""
+        with self.lock:
+            if not self.batch:
+                return
+            message = {'frames': self.batch}
+            targets = self.batch_targets
+            self.batch = []
+            self.batch_targets = 0
+            self.batch_started = None
+            if self.encoding == MSGPACK_ENCODING:
+                payload = msgpack.packb(message)
+            else:
+                payload = encode_json(message)
+            self._send(payload, targets)
+
+    def close(self):
+        """Stop the window timer and send what is left"""
+        self.stop_event.set()
+        if self.flush_thread is not None and self.flush_thread is not threading.current_thread():
+            self.flush_thread.join()
+        self.flush()
+
+    def _send(self, payload, targets):
+        try:
+            self.send(payload, self.qos)
+            self.messages_published += 1
+            self.targets_published += targets
+            self.bytes_published += len(payload)
+        except Exception as e:
+            self.publish_errors += 1
+            print(f"Failed to publish targets: {e}")
+
+    def get_stats(self):
+        return {
+            'mode': self.mode,
+            'encoding': self.encoding if self.mode == FRAME_MODE else JSON_ENCODING,
+            'messages_published': self.messages_published,
+            'targets_published': self.targets_published,
+            'bytes_published': self.bytes_published,
+            'avg_message_bytes': round(self.bytes_published / self.messages_published, 1) if self.messages_published else 0,
+            'publish_errors': self.publish_errors,
+        }
@@ -0,0 +1,347 @@
+import asyncio
+import json
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+import paho.mqtt.client as mqtt
+from frame_reassembly import FrameAssembler
+from radar_processing import RadarProcessor
+from radar_metrics import METRICS
+from radar_publisher import FramePublisher
+from config import *
+
+
+class AsyncMqttPublisher:
+    def __init__(self, broker=MQTT_BROKER, port=MQTT_PORT, channel=MQTT_CHANNEL,
+                 username=MQTT_USERNAME, password=MQTT_PASSWORD,
+                 reconnect_min_delay=MQTT_RECONNECT_MIN_DELAY, reconnect_max_delay=MQTT_RECONNECT_MAX_DELAY):
+        """
+        paho client driven by the asyncio event loop instead of a background thread
+
+        The client's socket is registered with the loop (add_reader/add_writer),
+        so reads, writes and keepalives happen without blocking or busy-waiting.
+        Connecting runs in the default executor. A lost connection is re-established
+        with a delay doubling from reconnect_min_delay up to reconnect_max_delay seconds,
+        as loop_start's thread would do.
+        """
+        self.broker = broker
+        self.port = port
+        self.channel = channel
+        self.reconnect_min_delay = reconnect_min_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self.loop = None
+        self.misc_task = None
+        self.reconnect_task = None
+        self.stopping = False
+        self.connected = False
+        self.messages_published = 0
+        self.publish_errors = 0
+        self.reconnects = 0
+
+        self.client = mqtt.Client()
+        self.client.username_pw_set(username, password)
+        self.client.on_connect = self.on_connect
+        self.client.on_disconnect = self.on_disconnect
+        self.client.on_socket_open = self.on_socket_open
+        self.client.on_socket_close = self.on_socket_close
+        self.client.on_socket_register_write = self.on_socket_register_write
+        self.client.on_socket_unregister_write = self.on_socket_unregister_write
+
+    def on_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            print(f"✅ Connected to MQTT broker at {self.broker}:{self.port}")
+            self.connected = True
+        else:
+            print(f"⚠️ Connection failed with result code {rc}")
+
+    def on_disconnect(self, client, userdata, rc):
+        self.connected = False
+        if rc != 0:
+            print(f"⚠️ Disconnected from MQTT broker (result code {rc}), reconnecting...")
+            self._call_in_loop(self._start_reconnect)
+
+    # paho calls the socket callbacks from the executor thread while connecting
+    def on_socket_open(self, client, userdata, sock):
+        self._call_in_loop(self._register_socket, sock)
+
+    def on_socket_close(self, client, userdata, sock):
+        self._call_in_loop(self._unregister_socket, sock)
+
+    def on_socket_register_write(self, client, userdata, sock):
+        self._call_in_loop(self.loop.add_writer, sock, client.loop_write)
+
+    def on_socket_unregister_write(self, client, userdata, sock):
+        self._call_in_loop(self.loop.remove_writer, sock)
+
+    def _call_in_loop(self, callback, *args):
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self.loop:
+            callback(*args)
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    def _register_socket(self, sock):
+        self.loop.add_reader(sock, self.client.loop_read)
+        if self.misc_task is None:
+            self.misc_task = self.loop.create_task(self._misc_loop())
+
+    def _unregister_socket(self, sock):
+        self.loop.remove_reader(sock)
+        self.loop.remove_writer(sock)
+        if self.misc_task is not None:
+            self.misc_task.cancel()
+            self.misc_task = None
+
+    async def _misc_loop(self):
+        # Keepalive pings and retries, what loop_start's thread would otherwise do
+        while self.client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                return
+        # No connection any more (MQTT_ERR_NO_CONN)
+        self.misc_task = None
+        self._start_reconnect()
+
+    def _start_reconnect(self):
+        if not self.stopping and (self.reconnect_task is None or self.reconnect_task.done()):
+            self.reconnect_task = self.loop.create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self):
+        delay = self.reconnect_min_delay
+        while not self.stopping:
+            await asyncio.sleep(delay)
+            try:
+                await self.loop.run_in_executor(None, self.client.reconnect)
+                self.reconnects += 1
+                return
+            except Exception as e:
+                print(f"⚠️ MQTT reconnect failed: {e}, retrying in {min(delay * 2, self.reconnect_max_delay)} s")
+                delay = min(delay * 2, self.reconnect_max_delay)
+
+    async def connect(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopping = False
+        try:
+            await self.loop.run_in_executor(None, self.client.connect, self.broker, self.port, 60)
+        except Exception as e:
+            # Keep serving the radars, publishing starts once the broker is reachable
+            print(f"⚠️ Could not connect to MQTT broker at {self.broker}:{self.port}: {e}")
+            self._start_reconnect()
+
+    async def disconnect(self):
+        self.stopping = True
+        if self.reconnect_task is not None:
+            self.reconnect_task.cancel()
+            self.reconnect_task = None
+        self.client.disconnect()
+        # Let the loop flush the DISCONNECT packet
+        await asyncio.sleep(0)
+
+    def publish(self, payload, qos=MQTT_QOS):
+        try:
+            self.client.publish(self.channel, payload, qos=qos)
+            self.messages_published += 1
+        except Exception as e:
+            self.publish_errors += 1
+            print(f"Failed to publish target: {e}")
+
+
+class RadarDatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, stream):
+        self.stream = stream
+
+    def datagram_received(self, data, addr):
+        self.stream.datagram_received(data)
+
+    def error_received(self, exc):
+        print(f"[{self.stream.radar_id}] UDP error: {exc}")
+
+
+class RadarStream:
+    def __init__(self, definition, publisher=None, queue_size=FRAME_QUEUE_SIZE):
+        """
+        One radar served by the event loop: UDP endpoint, frame reassembly and
+        a worker that runs decode/classify/track off the loop
+
+        Args:
+            definition: Dict with radar_id, area_id, local_ip, local_port, latitude, longitude
+            publisher: AsyncMqttPublisher, or None to not publish
+            queue_size: Frames buffered between the UDP endpoint and the worker (oldest dropped when full)
+        """
+        self.radar_id = definition['radar_id']
+        self.local_ip = definition['local_ip']
+        self.local_port = definition['local_port']
+        self.processor = RadarProcessor(
+            radar_id=definition['radar_id'],
+            area_id=definition['area_id'],
+            radar_lat=definition['latitude'],
+            radar_long=definition['longitude'],
+        )
+        self.assembler = FrameAssembler(radar_id=self.radar_id)
+        self.publisher = publisher
+        # Per-target or per-frame messages (MQTT_PUBLISH_MODE), batched per radar
+        self.frame_publisher = FramePublisher(publisher.publish) if publisher is not None else None
+        self.frames = asyncio.Queue(maxsize=queue_size)
+        # One thread per radar keeps its frames in order and its tracker single-threaded
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"radar-{self.radar_id}")
+        self.transport = None
+        self.worker_task = None
+
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.targets_published = 0
+        self.last_frame_time = None
+
+        self.publish_time = METRICS.histogram("radar_stage_seconds", "Processing time per frame and stage", radar=self.radar_id, stage="publish")
+        METRICS.gauge("radar_frames_dropped_total", lambda: self.frames_dropped, "Frames dropped", kind="counter",
+                      radar=self.radar_id, reason="frame_queue")
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(
+            lambda: RadarDatagramProtocol(self), local_addr=(self.local_ip, self.local_port)
+        )
+        self.worker_task = loop.create_task(self._worker())
+        print(f"[{self.radar_id}] Listening on {self.local_ip}:{self.local_port}...")
+
+    async def stop(self):
+        if self.transport is not None:
+            self.transport.close()
+        if self.worker_task is not None:
+            self.worker_task.cancel()
+            try:
+                await self.worker_task
+            except asyncio.CancelledError:
+                pass
+        if self.frame_publisher is not None:
+            self.frame_publisher.close()
+        self.executor.shutdown(wait=True)
+
+    def datagram_received(self, data):
+        for frame in self.assembler.add_datagram(data, time.time()):
+            if self.frames.full():
+                self.frames.get_nowait()
+                self.frames_dropped += 1
+            self.frames.put_nowait(frame)
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            frame = await self.frames.get()
+            try:
+                targets, tracked_targets = await loop.run_in_executor(self.executor, self.processor.process_frame, frame)
+            except Exception as e:
+                print(f"[{self.radar_id}] Processing failed for frame {frame.frame_id}: {e}")
+                continue
+
+            self.frames_processed += 1
+            self.last_frame_time = time.time()
+
+            if self.frame_publisher is not None:
+                start = time.perf_counter()
+                self.frame_publisher.publish_frame(tracked_targets)
+                self.publish_time.record(time.perf_counter() - start)
+                self.targets_published += len(tracked_targets)
+
+    def get_health(self):
+        return {
+            'listening': f"{self.local_ip}:{self.local_port}",
+            'frames_processed': self.frames_processed,
+            'frames_dropped': self.frames_dropped,
+            'frames_queued': self.frames.qsize(),
+            'targets_published': self.targets_published,
+            'tracks': len(self.processor.tracker.tracks),
+            'mqtt': self.frame_publisher.get_stats() if self.frame_publisher is not None else None,
+            'last_frame_age': round(time.time() - self.last_frame_time, 3) if self.last_frame_time else None,
+            'reassembly': self.assembler.get_stats(),
+        }
+
+
+class RadarService:
+    def __init__(self, radar_definitions=None, send_mqtt=SEND_MQTT, health_host=HEALTH_HOST, health_port=HEALTH_PORT):
+        """
+        asyncio service serving several radars, the MQTT publisher and a health endpoint on one event loop
+
+        Args:
+            radar_definitions: List of radar dicts (see RadarStream), defaults to RADARS from config.py
+            send_mqtt: Publish tracked targets via MQTT
+            health_host, health_port: Address of the HTTP endpoint (GET /health and GET /metrics), None port disables it
+        """
+        self.publisher = AsyncMqttPublisher() if send_mqtt else None
+        self.streams = [RadarStream(definition, self.publisher) for definition in (radar_definitions or RADARS)]
+        self.health_host = health_host
+        self.health_port = health_port
+        self.health_server = None
+        self.started_at = time.time()
+
+    async def run(self, stop_event=None):
+        stop_event = stop_event or asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop_event.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        if self.publisher is not None:
+            await self.publisher.connect()
+        for stream in self.streams:
+            await stream.start()
+        if self.health_port is not None:
+            self.health_server = await asyncio.start_server(self._handle_http, self.health_host, self.health_port)
+            print(f"Health endpoint on http://{self.health_host}:{self.health_port}/health (metrics on /metrics)")
+
+        await stop_event.wait()
+        print("\nStopping radar service...")
+
+        if self.health_server is not None:
+            self.health_server.close()
+            await self.health_server.wait_closed()
+        for stream in self.streams:
+            await stream.stop()
+        if self.publisher is not None:
+            await self.publisher.disconnect()
+
+    def get_health(self):
+        return {
+            'status': 'ok',
+            'uptime': round(time.time() - self.started_at, 1),
+            'mqtt_connected': self.publisher.connected if self.publisher is not None else None,
+            'mqtt_reconnects': self.publisher.reconnects if self.publisher is not None else None,
+            'radars': {stream.radar_id: stream.get_health() for stream in self.streams},
+        }
+
+    async def _handle_http(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            # Skip the request headers
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+
+            parts = request_line.decode(errors="replace").split()
+            path = parts[1] if len(parts) > 1 else ""
+            content_type = "application/json"
+            if path == "/health":
+                status, body = "200 OK", json.dumps(self.get_health())
+            elif path == "/metrics":
+                status, body = "200 OK", METRICS.render_prometheus()
+                content_type = "text/plain; version=0.0.4"
+            else:
+                status, body = "404 Not Found", json.dumps({'error': 'not found'})
+
+            body = body.encode()
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(RadarService().run())
@@ -0,0 +1,226 @@
+import multiprocessing
+import queue
+import signal
+import sys
+import time
+from radar_publisher import FramePublisher
+from config import *
+
+FRAME_MESSAGE = "frame"
+STATS_MESSAGE = "stats"
+
+
+def radar_worker(definition, output_queue, stop_event, stats_interval=1.0):
+    """
+    Receive, decode, classify and track one radar in its own process
+
+    Tracked targets are sent to output_queue as (FRAME_MESSAGE, radar_id, frame_id, tracked_targets),
+    cumulative counters as (STATS_MESSAGE, radar_id, stats) every stats_interval seconds.
+    """
+    # Ctrl+C reaches the whole process group, the supervisor stops the workers via stop_event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Imported here so the supervisor process does not load the classification model
+    from udp_receiver import DatagramReceiver
+    from frame_reassembly import FrameAssembler
+    from radar_processing import RadarProcessor
+
+    radar_id = definition['radar_id']
+    processor = RadarProcessor(
+        radar_id=radar_id,
+        area_id=definition['area_id'],
+        radar_lat=definition['latitude'],
+        radar_long=definition['longitude'],
+    )
+    assembler = FrameAssembler(radar_id=definition['radar_id'])
+    receiver = DatagramReceiver(definition['local_ip'], definition['local_port'])
+
+    stats = {
+        'frames': 0,
+        'targets': 0,
+        'tracked_targets': 0,
+        'process_time': 0.0,
+        'output_dropped': 0,
+        'frames_failed': 0,
+    }
+    last_stats = time.monotonic()
+
+    with receiver:
+        print(f"[{radar_id}] Listening on {definition['local_ip']}:{definition['local_port']}...")
+        while not stop_event.is_set():
+            for datagram, received_at in receiver.receive_batch(timeout=0.2):
+                for frame in assembler.add_datagram(datagram, received_at):
+                    start = time.perf_counter()
+                    try:
+                        targets, tracked_targets = processor.process_frame(frame)
+                    except Exception as e:
+                        # Keep the worker and its tracks alive, skip the frame
+                        stats['frames_failed'] += 1
+                        print(f"[{radar_id}] Processing failed for frame {frame.frame_id}: {e}")
+                        continue
+                    stats['process_time'] += time.perf_counter() - start
+                    stats['frames'] += 1
+                    stats['targets'] += len(targets)
+                    stats['tracked_targets'] += len(tracked_targets)
+
+                    try:
+                        output_queue.put_nowait((FRAME_MESSAGE, radar_id, frame.frame_id, tracked_targets))
+                    except queue.Full:
+                        stats['output_dropped'] += 1
+
+            now = time.monotonic()
+            if now - last_stats >= stats_interval:
+                last_stats = now
+                report = dict(stats, receiver=receiver.get_stats(), reassembly=assembler.get_stats())
+                try:
+                    output_queue.put_nowait((STATS_MESSAGE, radar_id, report))
+                except queue.Full:
+                    pass
+
+
+class RadarSupervisor:
+    def __init__(self, radar_definitions=None, sink=None, output_queue_size=SUPERVISOR_QUEUE_SIZE,
+                 report_interval=SUPERVISOR_REPORT_INTERVAL):
+        """
+        Run one worker process per radar and collect their results in this process
+
+        Args:
+            radar_definitions: List of radar dicts, defaults to RADARS from config.py
+            sink: Callable (radar_id, frame_id, tracked_targets) for every processed frame
+            output_queue_size: Size of the queue shared by all workers
+            report_interval: Seconds between per-radar throughput reports
+        """
+        self.radar_definitions = radar_definitions or RADARS
+        self.sink = sink
+        self.report_interval = report_interval
+        self.output_queue = multiprocessing.Queue(maxsize=output_queue_size)
+        self.stop_event = multiprocessing.Event()
+        self.processes = {}  # radar_id -> Process
+        self.stats = {}  # radar_id -> last stats received
+        self.last_report = {}  # radar_id -> (time, frames, targets) at the last report
+
+    def start(self):
+        for definition in self.radar_definitions:
+            self._start_worker(definition)
+        return self
+
+    def _start_worker(self, definition):
+        process = multiprocessing.Process(
+            target=radar_worker,
+            args=(definition, self.output_queue, self.stop_event),
+            name=f"radar-{definition['radar_id']}",
+            daemon=True,
+        )
+        process.start()
+        self.processes[definition['radar_id']] = process
+
+    def stop(self, timeout=2.0):
+        self.stop_event.set()
+        for process in self.processes.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+
+    def run(self):
+        """Dispatch worker output to the sink until stop() is called"""
+        next_report = time.monotonic() + self.report_interval
+        while not self.stop_event.is_set():
+            try:
+                message = self.output_queue.get(timeout=0.2)
+            except queue.Empty:
+                message = None
+
+            if message is not None:
+                if message[0] == FRAME_MESSAGE:
+                    _, radar_id, frame_id, tracked_targets = message
+                    if self.sink is not None:
+                        self.sink(radar_id, frame_id, tracked_targets)
+                else:
+                    _, radar_id, stats = message
+                    self.stats[radar_id] = stats
+
+            if time.monotonic() >= next_report:
+                next_report += self.report_interval
+                self._restart_dead_workers()
+                self.print_report()
+
+    def _restart_dead_workers(self):
+        for definition in self.radar_definitions:
+            process = self.processes[definition['radar_id']]
+            if not process.is_alive() and not self.stop_event.is_set():
+                print(f"[{definition['radar_id']}] Worker exited with code {process.exitcode}, restarting...")
+                self._start_worker(definition)
+
+    def get_throughput(self):
+        """Frames/s and targets/s per radar since the previous call"""
+        now = time.monotonic()
+        throughput = {}
+        for radar_id, stats in self.stats.items():
+            last_time, last_frames, last_targets = self.last_report.get(radar_id, (now, stats['frames'], stats['targets']))
+            elapsed = now - last_time
+            throughput[radar_id] = {
+                'frames_per_second': round((stats['frames'] - last_frames) / elapsed, 2) if elapsed > 0 else 0.0,
+                'targets_per_second': round((stats['targets'] - last_targets) / elapsed, 2) if elapsed > 0 else 0.0,
+                'avg_process_ms': round(stats['process_time'] / stats['frames'] * 1e3, 3) if stats['frames'] else 0.0,
+                'frames': stats['frames'],
+                'output_dropped': stats['output_dropped'],
+                'frames_failed': stats['frames_failed'],
+                'kernel_drops': stats['receiver']['kernel_drops'],
+                'checksum_failures': stats['reassembly']['checksum_failures'],
+            }
+            self.last_report[radar_id] = (now, stats['frames'], stats['targets'])
+        return throughput
+
+    def print_report(self):
+        print(f"{'Radar':<20} {'Frames/s':<10} {'Targets/s':<10} {'Avg ms':<8} {'Frames':<10} {'Dropped':<8} {'Failed':<8} {'Kernel':<8} {'Checksum':<8}")
+        for radar_id, radar in self.get_throughput().items():
+            print(f"{radar_id:<20} {radar['frames_per_second']:<10} {radar['targets_per_second']:<10} "
+                  f"{radar['avg_process_ms']:<8} {radar['frames']:<10} {radar['output_dropped']:<8} "
+                  f"{radar['frames_failed']:<8} {str(radar['kernel_drops']):<8} {radar['checksum_failures']:<8}")
+
+
+def main():
+    mqtt_client = None
+    if SEND_MQTT:
+        import paho.mqtt.client as mqtt
+        mqtt_client = mqtt.Client()
+        mqtt_client.username_pw_set(MQTT_USERNAME, MQTT_PASSWORD)
+        try:
+            mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 60)
+            mqtt_client.loop_start()
+            print(f"Connected to MQTT broker at {MQTT_BROKER}:{MQTT_PORT}")
+        except Exception as e:
+            print(f"Failed to connect to MQTT broker: {e}")
+            sys.exit(1)
+
+    mqtt_publisher = None
+    if mqtt_client is not None:
+        mqtt_publisher = FramePublisher(lambda payload, qos: mqtt_client.publish(MQTT_CHANNEL, payload, qos=qos))
+
+    def publish(radar_id, frame_id, tracked_targets):
+        # One shared output for all radars
+        if mqtt_publisher is not None:
+            mqtt_publisher.publish_frame(tracked_targets)
+
+    supervisor = RadarSupervisor(sink=publish).start()
+
+    def signal_handler(sig, frame):
+        print("\nCtrl+C detected! Stopping radar workers...")
+        supervisor.stop_event.set()
+
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    supervisor.run()
+    supervisor.stop()
+    supervisor.print_report()
+
+    if mqtt_client is not None:
+        mqtt_publisher.close()
+        print(f"MQTT: {mqtt_publisher.get_stats()}")
+        mqtt_client.loop_stop()
+        mqtt_client.disconnect()
+
+
+if __name__ == "__main__":
+    main()
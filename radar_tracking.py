@@ -1,78 +1,183 @@
 import numpy as np
 from scipy.spatial import distance
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
 from filterpy.kalman import KalmanFilter
 import uuid
 import time
+from collections import deque
+from functools import lru_cache
 from datetime import datetime, timedelta
+from radar_decoder import TargetRecord
 from config import *
 import math
 
+def _kalman_matrices(dt=0.1):
+    """F, H, R and Q of the constant acceleration model (x, y, vx, vy, ax, ay)"""
+    # State transition matrix (position + velocity + acceleration model)
+    F = np.array([
+        [1, 0, dt, 0, 0.5*dt**2, 0],
+        [0, 1, 0, dt, 0, 0.5*dt**2],
+        [0, 0, 1, 0, dt, 0],
+        [0, 0, 0, 1, 0, dt],
+        [0, 0, 0, 0, 1, 0],
+        [0, 0, 0, 0, 0, 1]
+    ])
+    
+    # Measurement function (we only measure position x,y)
+    H = np.array([
+        [1, 0, 0, 0, 0, 0],
+        [0, 1, 0, 0, 0, 0]
+    ])
+    
+    # Measurement noise
+    R = np.array([
+        [5.0, 0],
+        [0, 5.0]
+    ])
+    
+    # Process noise
+    q = 0.001  # process noise
+    Q = np.array([
+        [q/4*dt**4, 0, q/2*dt**3, 0, q/2*dt**2, 0],
+        [0, q/4*dt**4, 0, q/2*dt**3, 0, q/2*dt**2],
+        [q/2*dt**3, 0, q*dt**2, 0, q*dt, 0],
+        [0, q/2*dt**3, 0, q*dt**2, 0, q*dt],
+        [q/2*dt**2, 0, q*dt, 0, q, 0],
+        [0, q/2*dt**2, 0, q*dt, 0, q]
+    ])
+    
+    return F, H, R, Q
+
+@lru_cache(maxsize=None)
+def _motion_model(dt):
+    """F and Q for a time step dt, computed once per dt bucket"""
+    F, _, _, Q = _kalman_matrices(dt)
+    F.flags.writeable = False
+    Q.flags.writeable = False
+    return F, Q
+
+def _dt_bucket(dt, resolution=TRACKER_DT_RESOLUTION, max_dt=TRACKER_MAX_DT):
+    """Round a time step to a multiple of resolution, at least one step and at most max_dt"""
+    steps = max(round(min(dt, max_dt) / resolution), 1)
+    return steps * resolution
+
+DEFAULT_DT = 0.1  # 100ms update rate from radar, used before the second frame
+
+def _initial_state(detection):
+    """Initial Kalman state (x, y, vx, vy, ax, ay) of a new track"""
+    return np.array([
+        detection.x,
+        detection.y,
+        detection.speed * np.cos(np.radians(detection.aizmuth_angle)),
+        detection.speed * np.sin(np.radians(detection.aizmuth_angle)),
+        0,
+        0
+    ], dtype=float)
+
+INITIAL_COVARIANCE = 50  # Initial covariance is INITIAL_COVARIANCE * identity
+
+class KalmanBank:
+    def __init__(self, dt=DEFAULT_DT, capacity=64):
+        """
+        Kalman filters of all tracks stored in stacked arrays
+
+        Row i of x (N, 6) and P (N, 6, 6) belongs to the i-th track of the
+        owning RadarTracker. predict and update run as batched matmuls and use
+        the same equations as filterpy.kalman.KalmanFilter.
+        """
+        self.F, self.H, self.R, self.Q = _kalman_matrices(dt)
+        self.x = np.zeros((capacity, 6))
+        self.P = np.zeros((capacity, 6, 6))
+        self.size = 0
+
+    def add(self, state):
+        """Append a filter with the given initial state, returns its row"""
+        if self.size == len(self.x):
+            self.x = np.concatenate([self.x, np.zeros_like(self.x)])
+            self.P = np.concatenate([self.P, np.zeros_like(self.P)])
+        self.x[self.size] = state
+        self.P[self.size] = np.eye(6) * INITIAL_COVARIANCE
+        self.size += 1
+        return self.size - 1
+
+    def keep(self, rows):
+        """Keep only the given rows (in that order), e.g. after removing tracks"""
+        rows = np.asarray(rows, dtype=np.intp)
+        self.x[:len(rows)] = self.x[rows]
+        self.P[:len(rows)] = self.P[rows]
+        self.size = len(rows)
+
+    def predict(self, rows=None, dt=None):
+        """Predict the given rows, or all rows, over dt seconds (default: the dt of the bank)"""
+        rows = slice(0, self.size) if rows is None else rows
+        F, Q = (self.F, self.Q) if dt is None else _motion_model(dt)
+        self.x[rows] = self.x[rows] @ F.T
+        self.P[rows] = F @ self.P[rows] @ F.T + Q
+
+    def update(self, rows, z):
+        """Measurement update of the given rows with positions z (len(rows), 2)"""
+        x = self.x[rows]
+        P = self.P[rows]
+
+        y = np.asarray(z, dtype=float) - x @ self.H.T
+        PHT = P @ self.H.T
+        S = self.H @ PHT + self.R
+        K = PHT @ np.linalg.inv(S)
+        x = x + (K @ y[:, :, np.newaxis])[:, :, 0]
+
+        # Joseph form, as in filterpy
+        I_KH = np.eye(6) - K @ self.H
+        P = I_KH @ P @ I_KH.transpose(0, 2, 1) + K @ self.R @ K.transpose(0, 2, 1)
+
+        self.x[rows] = x
+        self.P[rows] = P
+
 class RadarTarget:
-    def __init__(self, target_info, track_id=None):
+    def __init__(self, target_info, track_id=None, bank=None, history_depth=TRACK_HISTORY_DEPTH,
+                 classification_decay=TRACK_CLASSIFICATION_DECAY, timestamp=None):
         # Initialize target with detection data
         self.id = track_id if track_id else str(uuid.uuid4())[:8]
         self.first_detection = target_info
         self.last_detection = target_info
-        self.detection_history = [target_info]
-        self.last_update_time = time.time()
+        # Only the most recent detections are kept, memory per track stays constant
+        self.detection_history = deque([target_info], maxlen=history_depth)
+        self.hits = 1
+        # Capture time of the last detection, wall clock if not given
+        self.last_update_time = time.time() if timestamp is None else timestamp
         self.consecutive_misses = 0
-        self.classified_as = target_info['classification']
-        self.classification_history = [target_info['classification']]
-        self.classification_counts = {target_info['classification']: 1}
+        self.classified_as = target_info.classification
+        self.classification_history = deque([target_info.classification], maxlen=history_depth)
+        
+        # Classification votes, older votes weigh classification_decay times less per detection (1.0 is a plain majority)
+        self.classification_decay = classification_decay
+        self.vote_weight = 1.0
+        self.classification_counts = {target_info.classification: 1.0}
+        
+        # Track-level classification cache: model output and features of the last classified detection
+        self.last_classification = target_info.classification
+        self.classification_features = (target_info.range, target_info.speed, target_info.aizmuth_angle)
+        self.frames_since_classification = 0
         
-        # Initialize Kalman filter
-        self.kf = self._initialize_kalman_filter(target_info)
+        # Initialize Kalman filter, either a filterpy object or a row in a shared KalmanBank
+        self.bank = bank
+        if bank is not None:
+            self.kf = None
+            self.slot = bank.add(_initial_state(target_info))
+        else:
+            self.kf = self._initialize_kalman_filter(target_info)
         
     def _initialize_kalman_filter(self, detection):
         """Initialize Kalman filter with 6 state variables (x, y, vx, vy, ax, ay)"""
         kf = KalmanFilter(dim_x=6, dim_z=2)
-        
-        # State transition matrix (position + velocity + acceleration model)
-        dt = 0.1  # 100ms update rate from radar
-        kf.F = np.array([
-            [1, 0, dt, 0, 0.5*dt**2, 0],
-            [0, 1, 0, dt, 0, 0.5*dt**2],
-            [0, 0, 1, 0, dt, 0],
-            [0, 0, 0, 1, 0, dt],
-            [0, 0, 0, 0, 1, 0],
-            [0, 0, 0, 0, 0, 1]
-        ])
-        
-        # Measurement function (we only measure position x,y)
-        kf.H = np.array([
-            [1, 0, 0, 0, 0, 0],
-            [0, 1, 0, 0, 0, 0]
-        ])
-        
-        # Measurement noise
-        kf.R = np.array([
-            [5.0, 0],
-            [0, 5.0]
-        ])
-        
-        # Process noise
-        q = 0.001  # process noise
-        kf.Q = np.array([
-            [q/4*dt**4, 0, q/2*dt**3, 0, q/2*dt**2, 0],
-            [0, q/4*dt**4, 0, q/2*dt**3, 0, q/2*dt**2],
-            [q/2*dt**3, 0, q*dt**2, 0, q*dt, 0],
-            [0, q/2*dt**3, 0, q*dt**2, 0, q*dt],
-            [q/2*dt**2, 0, q*dt, 0, q, 0],
-            [0, q/2*dt**2, 0, q*dt, 0, q]
-        ])
+        kf.F, kf.H, kf.R, kf.Q = _kalman_matrices(dt=DEFAULT_DT)
         
         # Initial state
-        kf.x = np.array([
-            [detection['x']],
-            [detection['y']],
-            [detection['speed'] * np.cos(np.radians(detection['aizmuth_angle']))],
-            [detection['speed'] * np.sin(np.radians(detection['aizmuth_angle']))],
-            [0],
-            [0]
-        ]).reshape(6, 1)
+        kf.x = _initial_state(detection).reshape(6, 1)
         
         # Initial covariance
-        kf.P = np.eye(6) * 50
+        kf.P = np.eye(6) * INITIAL_COVARIANCE
         
         return kf
     
@@ -99,45 +204,100 @@ class RadarTarget:
     #     # Update most frequent classification
     #     self.classified_as = max(self.classification_counts, key=self.classification_counts.get)
 
-    def update(self, detection):
-        """Update target with new detection"""
+    def update(self, detection, dt=None, timestamp=None):
+        """Update target with new detection, dt is the time since the previous frame"""
         # Update Kalman filter
-        z = np.array([detection['x'], detection['y']])
-        self.kf.predict()
-        self.kf.update(z)
+        z = np.array([detection.x, detection.y])
+        if self.kf is not None:
+            self._predict_filter(dt)
+            self.kf.update(z)
+        else:
+            self.bank.predict([self.slot], dt)
+            self.bank.update([self.slot], z[np.newaxis, :])
+
+        self.record_detection(detection, timestamp)
 
+    def record_detection(self, detection, timestamp=None):
+        """Update the target properties with a detection (Kalman filter already updated)"""
         # Update target properties
         self.last_detection = detection
         self.detection_history.append(detection)
-        self.last_update_time = time.time()
+        self.hits += 1
+        self.last_update_time = time.time() if timestamp is None else timestamp
         self.consecutive_misses = 0
 
         # Update classification
-        self.classification_history.append(detection['classification'])
-        self.classification_counts[detection['classification']] = self.classification_counts.get(detection['classification'], 0) + 1
-
-        # Update most frequent classification
-        self.classified_as = max(self.classification_counts, key=self.classification_counts.get)
+        self.classification_history.append(detection.classification)
+        self._vote(detection.classification)
 
         # Ensure signal strength is updated
-        if 'signal_strength' in detection:
-            self.last_detection['signal_strength'] = detection['signal_strength']
+        self.last_detection.signal_strength = detection.signal_strength
 
+    def needs_classification(self, detection, interval, drift):
+        """Whether the detection has to be classified, or the cached classification can be reused"""
+        if self.frames_since_classification + 1 >= interval:
+            return True
+        range_val, speed, azimuth = self.classification_features
+        range_drift, speed_drift, azimuth_drift = drift
+        return (abs(detection.range - range_val) > range_drift or abs(detection.speed - speed) > speed_drift
+                or abs(detection.aizmuth_angle - azimuth) > azimuth_drift)
+
+    def cache_classification(self, detection):
+        """Remember the classified detection, its label is reused until needs_classification"""
+        self.last_classification = detection.classification
+        self.classification_features = (detection.range, detection.speed, detection.aizmuth_angle)
+        self.frames_since_classification = 0
+
+    def _vote(self, classification):
+        """Add one classification vote and update the leading classification"""
+        # Instead of decaying all votes, every new vote weighs 1/decay times more than the previous one
+        if self.classification_decay != 1.0:
+            self.vote_weight /= self.classification_decay
+            if self.vote_weight > 1e6:
+                # Rescale before the weights overflow
+                for key in self.classification_counts:
+                    self.classification_counts[key] /= self.vote_weight
+                self.vote_weight = 1.0
+        self.classification_counts[classification] = self.classification_counts.get(classification, 0.0) + self.vote_weight
+        
+        # Only this classification gained, so it either takes the lead or the leader stays
+        if self.classification_counts[classification] > self.classification_counts[self.classified_as]:
+            self.classified_as = classification
     
-    def predict(self):
+    def predict(self, dt=None):
         """Predict next position without measurement update"""
-        self.kf.predict()
+        if self.kf is not None:
+            self._predict_filter(dt)
+        else:
+            self.bank.predict([self.slot], dt)
         return self.get_predicted_position()
     
-    def get_predicted_position(self):
-        """Get predicted position"""
-        x, y = self.kf.x[0, 0], self.kf.x[1, 0]
-        vx, vy = self.kf.x[2, 0], self.kf.x[3, 0]
-        speed = np.sqrt(vx**2 + vy**2)
+    def _predict_filter(self, dt):
+        if dt is None:
+            self.kf.predict()
+        else:
+            F, Q = _motion_model(dt)
+            self.kf.predict(F=F, Q=Q)
+    
+    @property
+    def state(self):
+        """Kalman state (x, y, vx, vy, ax, ay) as 1-d array"""
+        return self.kf.x[:, 0] if self.kf is not None else self.bank.x[self.slot]
+    
+    def _kinematics(self):
+        """Predicted x, y, speed, heading and range as floats"""
+        x, y, vx, vy = self.state[:4].tolist()
+        speed = math.hypot(vx, vy)
         
         # Calculate azimuth from velocity vector
-        azimuth = np.degrees(np.arctan2(vy, vx))
-        range_val = np.sqrt(x**2 + y**2)
+        azimuth = math.degrees(math.atan2(vy, vx))
+        range_val = math.hypot(x, y)
+        
+        return x, y, speed, azimuth, range_val
+    
+    def get_predicted_position(self):
+        """Get predicted position"""
+        x, y, speed, azimuth, range_val = self._kinematics()
         
         return {
             'x': x,
@@ -147,28 +307,135 @@ class RadarTarget:
             'range': range_val
         }
     
-    def get_state(self):
-        """Get current state as dict with tracking info"""
-        state = self.last_detection.copy()
-        
-        # Update with Kalman filter state
-        predicted = self.get_predicted_position()
+    def get_state(self, now=None):
+        """Get current state as TrackedTarget with tracking info, last_seen is relative to now (default: wall clock)"""
+        now = time.time() if now is None else now
+        # Kalman filter state on top of the last detection
+        x, y, speed, azimuth, range_val = self._kinematics()
+        return TrackedTarget(
+            self.last_detection, self.id, x, y, speed, azimuth, range_val,
+            self.classified_as, self.hits, now - self.last_update_time
+        )
+
+class TrackedTarget:
+    """
+    Output of the tracker for one track
+
+    Fields the tracker does not set (signal_strength, timestamp, classification ...)
+    are read from the track's last detection, which is not copied.
+    """
+    
+    __slots__ = ('detection', 'track_id', 'x', 'y', 'speed', 'aizmuth_angle', 'range', 'tracked_classification',
+                 'age', 'last_seen', 'predicted_x', 'predicted_y', 'time_to_closest_approach')
+    
+    def __init__(self, detection, track_id, x, y, speed, aizmuth_angle, range, tracked_classification, age, last_seen):
+        self.detection = detection
+        self.track_id = track_id
+        self.x = x
+        self.y = y
+        self.speed = speed
+        self.aizmuth_angle = aizmuth_angle
+        self.range = range
+        self.tracked_classification = tracked_classification
+        self.age = age
+        self.last_seen = last_seen
+        self.predicted_x = None
+        self.predicted_y = None
+        self.time_to_closest_approach = None
+    
+    @property
+    def signal_strength(self):
+        # Read for every track in process_and_track_targets, faster than going through __getattr__
+        return self.detection.signal_strength
+    
+    def __getattr__(self, name):
+        # Only called for names that are not slots, also while unpickling, before detection is set
+        if name == 'detection' or name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.detection, name)
+    
+    def to_dict(self):
+        """The tracked target as published and saved: the detection's fields updated with the track's"""
+        state = self.detection.to_dict()
         state.update({
-            'track_id': self.id,
-            'x': predicted['x'],
-            'y': predicted['y'],
-            'speed': predicted['speed'],
-            'aizmuth_angle': predicted['aizmuth_angle'],
-            'range': predicted['range'],
-            'tracked_classification': self.classified_as,
-            'age': len(self.detection_history),
-            'last_seen': time.time() - self.last_update_time
+            'track_id': self.track_id,
+            'x': self.x,
+            'y': self.y,
+            'speed': self.speed,
+            'aizmuth_angle': self.aizmuth_angle,
+            'range': self.range,
+            'tracked_classification': self.tracked_classification,
+            'age': self.age,
+            'last_seen': self.last_seen
         })
+        if self.predicted_x is not None:
+            state['predicted_x'] = self.predicted_x
+            state['predicted_y'] = self.predicted_y
+        if self.time_to_closest_approach is not None:
+            state['time_to_closest_approach'] = self.time_to_closest_approach
         
         return state
 
+def _group_by_label(labels, n_labels):
+    """Indices sorted by label, start and count of every label, and the position of every index within its label"""
+    order = np.argsort(labels, kind='stable')
+    counts = np.bincount(labels, minlength=n_labels)
+    starts = np.cumsum(counts) - counts
+    local = np.empty(len(labels), dtype=np.int64)
+    local[order] = np.arange(len(labels)) - starts[labels[order]]
+    return order, starts, counts, local
+
+# Cell offsets of a cell and its eight neighbours
+NEIGHBOUR_OFFSETS = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)])
+
+class GatingGrid:
+    def __init__(self, gate, max_range=MAX_RANGE, max_azimuth=MAX_AZIMUTH, max_cells=65536):
+        """
+        Uniform grid over the radar's x/y field of view, finds the track/detection pairs that can be within the gate
+        
+        Args:
+            gate: Association distance, cells are at least this wide
+            max_range, max_azimuth: Field of view (x = range * cos(azimuth), y = range * sin(azimuth))
+            max_cells: Upper bound on the number of cells, larger cells are used for very small gates
+        """
+        half_width = max_range * np.sin(np.radians(max_azimuth))
+        extent = np.array([max_range, 2 * half_width], dtype=float)
+        self.origin = np.array([0.0, -half_width])
+        self.cell_size = max(gate, np.sqrt(extent.prod() / max_cells))
+        self.shape = np.maximum(np.ceil(extent / self.cell_size).astype(np.int64), 1)
+    
+    def _cells(self, positions):
+        cells = np.floor((positions - self.origin) / self.cell_size).astype(np.int64)
+        # Positions outside the field of view go to the border cells, which keeps neighbouring points in neighbouring cells
+        return np.clip(cells, 0, self.shape - 1)
+    
+    def candidate_pairs(self, track_positions, detection_positions):
+        """(track indices, detection indices) of all pairs in the same or in neighbouring cells"""
+        # Detections sorted by cell, with the first index and the count of every cell
+        detection_cells = self._cells(detection_positions)
+        detection_ids = detection_cells[:, 0] * self.shape[1] + detection_cells[:, 1]
+        order = np.argsort(detection_ids, kind='stable')
+        counts = np.bincount(detection_ids, minlength=self.shape[0] * self.shape[1])
+        starts = np.cumsum(counts) - counts
+        
+        # The 3x3 block of cells around every track
+        neighbours = self._cells(track_positions)[:, None, :] + NEIGHBOUR_OFFSETS
+        valid = ((neighbours >= 0) & (neighbours < self.shape)).all(axis=2)
+        track_index = np.broadcast_to(np.arange(len(track_positions))[:, None], valid.shape)[valid]
+        neighbour_ids = (neighbours[..., 0] * self.shape[1] + neighbours[..., 1])[valid]
+        
+        # One pair for every detection in those cells
+        pair_counts = counts[neighbour_ids]
+        rows = np.repeat(track_index, pair_counts)
+        within_cell = np.arange(pair_counts.sum()) - np.repeat(np.cumsum(pair_counts) - pair_counts, pair_counts)
+        cols = order[np.repeat(starts[neighbour_ids], pair_counts) + within_cell]
+        return rows, cols
+
 class RadarTracker:
-    def __init__(self, max_distance=0.5, max_age=2, hit_threshold=3):
+    def __init__(self, max_distance=0.5, max_age=2, hit_threshold=3, backend=TRACKER_BACKEND, association=TRACKER_ASSOCIATION,
+                 gating=TRACKER_GATING, history_depth=TRACK_HISTORY_DEPTH,
+                 classification_decay=TRACK_CLASSIFICATION_DECAY, classifier=None,
+                 classification_interval=TRACK_CLASSIFICATION_INTERVAL, classification_drift=TRACK_CLASSIFICATION_DRIFT):
         """
         Initialize tracker
         
@@ -176,25 +443,83 @@ class RadarTracker:
             max_distance: Maximum distance for track association (meters)
             max_age: Maximum time without update before removing track (seconds)
             hit_threshold: Minimum detections before track is considered confirmed
+            backend: "batch" keeps the Kalman filters of all tracks in one KalmanBank,
+                "filterpy" uses one filterpy KalmanFilter per track
+            association: "hungarian" for the optimal (minimum total distance) assignment,
+                "greedy" to give each track, in order, its nearest free detection
+            gating: "grid" only scores track/detection pairs in neighbouring cells of a GatingGrid,
+                "dense" scores every pair
+            history_depth: Number of detections and classifications kept per track
+            classification_decay: Weight of a classification vote relative to the next one,
+                1.0 for a plain majority vote
+            classifier: Callable (ranges, speeds, azimuths) -> labels. When given, detections arrive
+                unclassified and only those of new tracks, of tracks whose features drifted by more than
+                classification_drift (range, speed, azimuth) and of tracks not classified for
+                classification_interval frames are classified; the others get their track's last label.
+                None when the detections are already classified. A classification_interval of None
+                classifies every detection, like 1.
         """
+        if backend not in ("batch", "filterpy"):
+            raise ValueError(f"Unknown tracker backend: {backend}")
+        if association not in ("hungarian", "greedy"):
+            raise ValueError(f"Unknown association method: {association}")
+        if gating not in ("grid", "dense"):
+            raise ValueError(f"Unknown gating method: {gating}")
+        
         self.tracks = []
         self.max_distance = max_distance
         self.max_age = max_age
         self.hit_threshold = hit_threshold
         self.next_id = 1
+        self.backend = backend
+        self.association = association
+        self.grid = GatingGrid(max_distance) if gating == "grid" else None
+        self.history_depth = history_depth
+        self.classification_decay = classification_decay
+        self.bank = KalmanBank() if backend == "batch" else None
+        self.classifier = classifier
+        # None (see TRACK_CLASSIFICATION_INTERVAL) classifies every detection
+        self.classification_interval = classification_interval if classification_interval is not None else 1
+        self.classification_drift = classification_drift
+        self.detections_classified = 0
+        self.classifications_cached = 0
+        self.now = None  # Capture time of the current frame
+        self.dt = DEFAULT_DT  # Time since the previous frame, rounded by _dt_bucket
     
-    def update(self, detections):
-        """Update tracker with new detections"""
+    def update(self, detections, timestamp=None):
+        """
+        Update tracker with new detections
+        
+        Args:
+            detections: TargetRecords of one frame
+            timestamp: Capture time of the frame in seconds, wall clock if not given.
+                Motion prediction, track aging and last_seen only depend on these timestamps,
+                so recorded frames replay the same at any speed.
+        """
+        now = time.time() if timestamp is None else timestamp
+        if self.now is not None:
+            self.dt = _dt_bucket(now - self.now)
+        self.now = now
+        
         # Predict new locations for all tracks
-        for track in self.tracks:
-            track.predict()
+        if self.bank is not None:
+            self.bank.predict(dt=self.dt)
+        else:
+            for track in self.tracks:
+                track.predict(self.dt)
         
         # Associate detections with existing tracks
-        unmatched_detections = self._associate_detections_to_tracks(detections)
+        matches, unmatched_detections = self._associate_detections_to_tracks(detections)
+        
+        if self.classifier is not None:
+            self._classify_detections(matches, detections, unmatched_detections)
+        
+        self._update_matched_tracks(matches, detections)
         
         # Create new tracks for unmatched detections
         for detection in unmatched_detections:
-            self.tracks.append(RadarTarget(detection))
+            self.tracks.append(RadarTarget(detection, bank=self.bank, history_depth=self.history_depth,
+                                           classification_decay=self.classification_decay, timestamp=self.now))
         
         # Remove old tracks
         self._cleanup_tracks()
@@ -203,106 +528,268 @@ class RadarTracker:
         return self.get_tracks()
     
     def _associate_detections_to_tracks(self, detections):
-        """Associate detections with existing tracks using nearest neighbor approach"""
+        """Associate detections with existing tracks, returns the (track index, detection index) matches and the unmatched detections"""
         if not self.tracks:
-            return detections
+            return [], detections
         
         if not detections:
             # No detections, increment consecutive misses for all tracks
             for track in self.tracks:
                 track.consecutive_misses += 1
-            return []
+            return [], []
         
-        # Calculate distance matrix
-        distance_matrix = np.zeros((len(self.tracks), len(detections)))
+        detection_positions = np.array([(detection.x, detection.y) for detection in detections], dtype=float)
+        rows, cols, distances = self._gated_pairs(self._track_positions(), detection_positions)
+        
+        if self.association == "hungarian":
+            matches = self._hungarian_matches(rows, cols, distances, len(self.tracks), len(detections))
+        else:
+            matches = self._greedy_matches(rows, cols, distances)
+        
+        matched_tracks = {i for i, _ in matches}
+        matched_detections = {j for _, j in matches}
         
         for i, track in enumerate(self.tracks):
-            predicted = track.get_predicted_position()
-            for j, detection in enumerate(detections):
-                # Calculate Euclidean distance
-                dist = np.sqrt((predicted['x'] - detection['x'])**2 + 
-                              (predicted['y'] - detection['y'])**2)
-                distance_matrix[i, j] = dist
-        
-        # Associate using greedy nearest neighbor
-        matched_detections = set()
-        unmatched_detections = []
-        
-        # For each track, find nearest detection
-        for i, track in enumerate(self.tracks):
-            if len(detections) == 0:
+            if i not in matched_tracks:
+                # No match found
                 track.consecutive_misses += 1
+        
+        # Collect unmatched detections
+        return matches, [detection for j, detection in enumerate(detections) if j not in matched_detections]
+    
+    def _track_positions(self):
+        """Predicted (x, y) of all tracks, shape (len(tracks), 2)"""
+        if self.bank is not None:
+            return self.bank.x[:self.bank.size, :2]
+        return np.array([track.state[:2] for track in self.tracks])
+    
+    def _gated_pairs(self, track_positions, detection_positions):
+        """(track indices, detection indices, Euclidean distances) of the pairs within max_distance"""
+        if self.grid is not None:
+            rows, cols = self.grid.candidate_pairs(track_positions, detection_positions)
+            distances = np.sqrt(((track_positions[rows] - detection_positions[cols]) ** 2).sum(axis=1))
+        else:
+            distance_matrix = distance.cdist(track_positions, detection_positions)
+            rows, cols = np.nonzero(distance_matrix <= self.max_distance)
+            distances = distance_matrix[rows, cols]
+        gated = distances <= self.max_distance
+        return rows[gated], cols[gated], distances[gated]
+    
+    def _greedy_matches(self, rows, cols, distances):
+        """Each track in turn takes its nearest detection within max_distance that is still free"""
+        matches = []
+        matched_tracks = set()
+        taken = set()
+        
+        # Pairs by track, then by distance (ties go to the lower detection index)
+        for k in np.lexsort((cols, distances, rows)).tolist():
+            i, j = int(rows[k]), int(cols[k])
+            if i in matched_tracks or j in taken:
                 continue
-                
-            # Get detections sorted by distance
-            detection_distances = [(j, distance_matrix[i, j]) for j in range(len(detections))]
-            detection_distances.sort(key=lambda x: x[1])
+            matches.append((i, j))
+            matched_tracks.add(i)
+            taken.add(j)
+        
+        return matches
+    
+    def _hungarian_matches(self, rows, cols, distances, n_tracks, n_detections):
+        """Assignment with the minimum total distance, pairs outside max_distance are never matched"""
+        if len(rows) == 0:
+            return []
+        
+        # Tracks and detections connected by gated pairs form independent assignment problems
+        graph = csr_matrix((np.ones(len(rows)), (rows, n_tracks + cols)), shape=(n_tracks + n_detections,) * 2)
+        n_components, labels = connected_components(graph, directed=False)
+        pair_order, pair_starts, pair_counts, _ = _group_by_label(labels[rows], n_components)
+        
+        # A component with a single pair is matched directly
+        single = pair_counts[labels[rows]] == 1
+        matches = list(zip(rows[single].tolist(), cols[single].tolist()))
+        
+        # Position of every track and detection within its component, the rows/columns of its cost matrix
+        track_order, track_starts, track_counts, track_local = _group_by_label(labels[:n_tracks], n_components)
+        detection_order, detection_starts, detection_counts, detection_local = _group_by_label(labels[n_tracks:], n_components)
+        
+        for component in np.flatnonzero(pair_counts > 1).tolist():
+            pairs = pair_order[pair_starts[component]:pair_starts[component] + pair_counts[component]]
+            r, c = track_local[rows[pairs]], detection_local[cols[pairs]]
+            shape = (track_counts[component], detection_counts[component])
+            candidate = np.zeros(shape, dtype=bool)
+            candidate[r, c] = True
+            # Larger than any sum of gated distances, so gated pairs are always preferred
+            cost = np.full(shape, (self.max_distance + 1) * (shape[0] + 1))
+            cost[r, c] = distances[pairs]
             
-            # Try to match with closest detection
-            for j, dist in detection_distances:
-                if j not in matched_detections and dist <= self.max_distance:
-                    track.update(detections[j])
-                    matched_detections.add(j)
-                    break
+            row_ind, col_ind = linear_sum_assignment(cost)
+            assigned = candidate[row_ind, col_ind]
+            track_ids = track_order[track_starts[component] + row_ind[assigned]]
+            detection_ids = detection_order[detection_starts[component] + col_ind[assigned]]
+            matches.extend(zip(track_ids.tolist(), detection_ids.tolist()))
+        
+        return matches
+    
+    def _classify_detections(self, matches, detections, unmatched_detections):
+        """Classify the detections of new, drifted and due tracks in one call, reuse the track's label for the rest"""
+        pending = list(unmatched_detections)
+        reclassified = []
+        for i, j in matches:
+            track, detection = self.tracks[i], detections[j]
+            if track.needs_classification(detection, self.classification_interval, self.classification_drift):
+                pending.append(detection)
+                reclassified.append((track, detection))
             else:
-                # No match found
-                track.consecutive_misses += 1
+                detection.classification = track.last_classification
+                track.frames_since_classification += 1
         
-        # Collect unmatched detections
-        for j, detection in enumerate(detections):
-            if j not in matched_detections:
-                unmatched_detections.append(detection)
+        self.classifications_cached += len(matches) - len(reclassified)
+        if not pending:
+            return
+        
+        labels = self.classifier([d.range for d in pending], [d.speed for d in pending], [d.aizmuth_angle for d in pending])
+        for detection, label in zip(pending, labels.tolist()):
+            detection.classification = label
+        for track, detection in reclassified:
+            track.cache_classification(detection)
+        self.detections_classified += len(pending)
+    
+    def _update_matched_tracks(self, matches, detections):
+        """Update the tracks of the (track index, detection index) pairs"""
+        if self.bank is None:
+            for i, j in matches:
+                self.tracks[i].update(detections[j], self.dt, self.now)
+            return
         
-        return unmatched_detections
+        if not matches:
+            return
+        
+        # Same steps as RadarTarget.update (predict, then correct), for all matched tracks at once
+        rows = [self.tracks[i].slot for i, _ in matches]
+        z = np.array([(detections[j].x, detections[j].y) for _, j in matches])
+        self.bank.predict(rows, self.dt)
+        self.bank.update(rows, z)
+        
+        for i, j in matches:
+            self.tracks[i].record_detection(detections[j], self.now)
     
     def _cleanup_tracks(self):
         """Remove old tracks"""
-        current_time = time.time()
+        current_time = self.now
         self.tracks = [track for track in self.tracks 
                       if (current_time - track.last_update_time < self.max_age and 
                           track.consecutive_misses < 5)]
+        
+        if self.bank is not None:
+            # Keep the bank rows in the same order as the tracks
+            self.bank.keep([track.slot for track in self.tracks])
+            for row, track in enumerate(self.tracks):
+                track.slot = row
     
     def get_tracks(self):
         """Get list of current tracks"""
-        return [track.get_state() for track in self.tracks 
-                if len(track.detection_history) >= self.hit_threshold]
+        return [track.get_state(self.now) for track in self.tracks 
+                if track.hits >= self.hit_threshold]
 
 # Function to integrate with your existing code
-def process_and_track_targets(targets, tracker):
+def process_and_track_targets(targets, tracker, timestamp=None):
     """
     Process radar targets and update tracker
     
     Args:
-        targets: List of target dictionaries
+        targets: List of TargetRecords
         tracker: RadarTracker instance
+        timestamp: Capture time of the frame (seconds), wall clock if not given
     
     Returns:
-        List of tracked objects with IDs and predicted states
+        List of TrackedTargets with IDs and predicted states
     """
     # Update tracker with new detections
-    tracked_targets = tracker.update(targets)
+    tracked_targets = tracker.update(targets, timestamp)
     
     filtered_targets = []
     # Add tracking-related info to each target
     for target in tracked_targets:
         # Calculate additional metrics if needed
-        if abs(target['speed']) > 0.2 and target['signal_strength'] > SIGNAL_STRENGTH_THRESHOLD:  # If moving
+        if abs(target.speed) > 0.2 and target.signal_strength > SIGNAL_STRENGTH_THRESHOLD:  # If moving
             # Predict position in 2 seconds
-            x_future = target['x'] + 2 * target['speed'] * np.cos(np.radians(target['aizmuth_angle']))
-            y_future = target['y'] + 2 * target['speed'] * np.sin(np.radians(target['aizmuth_angle']))
-            target['predicted_x'] = x_future
-            target['predicted_y'] = y_future
-            target['aizmuth_angle'] = max(-75, min(target['aizmuth_angle'], 75)) # keep the azimuth in range
+            x_future = target.x + 2 * target.speed * math.cos(math.radians(target.aizmuth_angle))
+            y_future = target.y + 2 * target.speed * math.sin(math.radians(target.aizmuth_angle))
+            target.predicted_x = x_future
+            target.predicted_y = y_future
+            target.aizmuth_angle = max(-75, min(target.aizmuth_angle, 75)) # keep the azimuth in range
             
             # Calculate time to closest approach (TCA) for targets moving toward radar
             # TCA is useful for collision avoidance or alerting
-            if abs(target['speed']) > 0 and target['range'] > 0:
+            if abs(target.speed) > 0 and target.range > 0:
                 # Radial velocity component
-                v_radial = target['speed'] * np.cos(np.radians(target['aizmuth_angle']))
+                v_radial = target.speed * math.cos(math.radians(target.aizmuth_angle))
                 if v_radial < 0:  # Target is approaching
-                    tca = -target['range'] / v_radial if v_radial != 0 else float('inf')
-                    target['time_to_closest_approach'] = round(tca, 2)  # in seconds
+                    tca = -target.range / v_radial if v_radial != 0 else float('inf')
+                    target.time_to_closest_approach = round(tca, 2)  # in seconds
             # print("FROM PROCESS TRACK TARGETS: ", target)
             filtered_targets.append(target)
     
-    return filtered_targets
\ No newline at end of file
+    return filtered_targets
+
+def _synthetic_scene(n_objects=30, n_frames=200, seed=1):
+    """Detections of objects moving in straight lines, with noise and missed detections"""
+    rng = np.random.default_rng(seed)
+    position = np.column_stack((rng.uniform(-50, 50, n_objects), rng.uniform(0, 100, n_objects)))
+    velocity = rng.uniform(-1, 1, (n_objects, 2))
+    frames = []
+    for _ in range(n_frames):
+        position += velocity * 0.1
+        visible = np.flatnonzero(rng.random(n_objects) < 0.9)
+        rng.shuffle(visible)
+        frames.append([TargetRecord(
+            radar_id=None, area_id=None, frame_id=0, timestamp=None, signal_strength=30.0, range=0.0,
+            speed=float(np.hypot(*velocity[i])),
+            aizmuth_angle=float(np.degrees(np.arctan2(velocity[i, 1], velocity[i, 0]))),
+            distance=0.0, direction="Static", classification='person', zone=0,
+            x=float(position[i, 0] + rng.normal(0, 0.3)),
+            y=float(position[i, 1] + rng.normal(0, 0.3)),
+            latitude=0.0, longitude=0.0,
+        ) for i in visible])
+    return frames
+
+
+if __name__ == "__main__":
+    # Timings of the batch backend and the per-track filterpy filters, tests/test_tracking.py checks they agree
+    frames = _synthetic_scene()
+    results = {}
+    for backend in ("filterpy", "batch"):
+        tracker = RadarTracker(max_distance=5.0, max_age=3, hit_threshold=2, backend=backend)
+        start = time.perf_counter()
+        results[backend] = [tracker.update(detections, timestamp=i * DEFAULT_DT) for i, detections in enumerate(frames)]
+        print(f"{backend:<10} {(time.perf_counter() - start) / len(frames) * 1e3:.3f} ms/frame")
+    
+    max_difference = 0.0
+    for tracks_filterpy, tracks_batch in zip(results["filterpy"], results["batch"]):
+        for a, b in zip(tracks_filterpy, tracks_batch):
+            max_difference = max(max_difference, *(abs(getattr(a, key) - getattr(b, key)) for key in ('x', 'y', 'speed', 'range')))
+    print(f"Max difference between backends: {max_difference:.3g}")
+    
+    # Association methods on the same scene
+    for association in ("greedy", "hungarian"):
+        tracker = RadarTracker(max_distance=5.0, max_age=3, hit_threshold=2, association=association)
+        start = time.perf_counter()
+        tracks = [tracker.update(detections, timestamp=i * DEFAULT_DT) for i, detections in enumerate(frames)]
+        print(f"{association:<10} {(time.perf_counter() - start) / len(frames) * 1e3:.3f} ms/frame, "
+              f"{sum(len(frame_tracks) for frame_tracks in tracks)} tracked targets")
+    
+    # Gating and assignment only, on scenes of 10 to 1000 targets spread over the field of view
+    rng = np.random.default_rng(2)
+    half_width = MAX_RANGE * np.sin(np.radians(MAX_AZIMUTH))
+    print(f"{'Targets':<10} {'Pairs':<8} {'dense ms':<10} {'grid ms':<10}")
+    for n_objects in (10, 30, 100, 300, 1000):
+        positions = np.column_stack((rng.uniform(0, MAX_RANGE, n_objects), rng.uniform(-half_width, half_width, n_objects)))
+        track_positions = positions + rng.normal(0, 0.3, positions.shape)
+        detection_positions = positions[rng.permutation(n_objects)[:int(n_objects * 0.9)]] + rng.normal(0, 0.3, (int(n_objects * 0.9), 2))
+        timings = {}
+        for gating in ("dense", "grid"):
+            tracker = RadarTracker(max_distance=5.0, gating=gating)
+            start = time.perf_counter()
+            for _ in range(20):
+                rows, cols, distances = tracker._gated_pairs(track_positions, detection_positions)
+                matches = tracker._hungarian_matches(rows, cols, distances, len(track_positions), len(detection_positions))
+            timings[gating] = (time.perf_counter() - start) / 20 * 1e3
+        print(f"{n_objects:<10} {len(rows):<8} {timings['dense']:<10.3f} {timings['grid']:<10.3f}")
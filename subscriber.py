@@ -1,4 +1,5 @@
 import paho.mqtt.client as mqtt
+from radar_publisher import TARGET_MODE, decode_message
 from config import *
 
 def on_connect(client, userdata, flags, rc):
@@ -6,7 +7,12 @@ def on_connect(client, userdata, flags, rc):
     client.subscribe(MQTT_CHANNEL)
 
 def on_message(client, userdata, msg):
-    print(f"Received message: {msg.payload.decode()}")
+    if MQTT_PUBLISH_MODE == TARGET_MODE:
+        print(f"Received message: {msg.payload.decode()}")
+        return
+    # Frame messages carry all tracks of one or more frames
+    for target in decode_message(msg.payload):
+        print(f"Received target: {target}")
 
 def main():
     client = mqtt.Client()
@@ -17,14 +23,13 @@ def main():
     client.on_message = on_message
 
     client.connect(MQTT_BROKER_SUBSCRIBER, MQTT_PORT, 60) # ip to the rpi4
-    client.loop_start()
 
     try:
-        while True:
-            pass  # The subscriber will keep running and print received messages
+        # Blocks in select() and calls on_message for each received message
+        client.loop_forever()
     except KeyboardInterrupt:
         print("Subscriber stopped.")
-        client.loop_stop()
+        client.disconnect()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,66 @@
+import os
+import numpy as np
+import pytest
+from radar_capture import CaptureReader
+from radar_decoder import (DATA_PACKET_PREFIX, HEADER_SIZE, TARGET_SIZE, calculate_checksum,
+                           _calculate_checksum_loop, parse_header)
+from frame_reassembly import FrameAssembler
+
+# Two frames (1 and 2 data packets) recorded with CAPTURE_FILE
+RECORDED_FRAMES = os.path.join(os.path.dirname(__file__), "data", "frames.cap")
+
+
+def random_frames(count, truncated, seed):
+    """(data, nrOfTargets) pairs, the data shorter than nrOfTargets * TARGET_SIZE if truncated"""
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        nr_of_targets = int(rng.integers(0, 257))
+        full_length = DATA_PACKET_PREFIX + nr_of_targets * TARGET_SIZE
+        if truncated:
+            length = int(rng.integers(0, full_length)) if full_length else 0
+        else:
+            length = int(rng.integers(full_length, full_length + 64))
+        yield rng.integers(0, 256, length, dtype=np.uint8).tobytes(), nr_of_targets
+
+
+@pytest.mark.parametrize("data, nr_of_targets", list(random_frames(500, truncated=False, seed=0)))
+def test_random_frames(data, nr_of_targets):
+    assert calculate_checksum(data, nr_of_targets, TARGET_SIZE) == _calculate_checksum_loop(data, nr_of_targets, TARGET_SIZE)
+
+
+@pytest.mark.parametrize("data, nr_of_targets", list(random_frames(500, truncated=True, seed=1)))
+def test_truncated_frames(data, nr_of_targets, capsys):
+    assert calculate_checksum(data, nr_of_targets, TARGET_SIZE) == _calculate_checksum_loop(data, nr_of_targets, TARGET_SIZE)
+    if nr_of_targets * TARGET_SIZE > max(len(data) - DATA_PACKET_PREFIX, 0):
+        assert "Warning: Index out of range" in capsys.readouterr().out
+
+
+def test_sum_above_32_bit():
+    data = b"\xff" * (DATA_PACKET_PREFIX + 0x1010101 * 4)
+    assert calculate_checksum(data, 0x1010101, 4) == sum(data[DATA_PACKET_PREFIX:]) & 0xFFFFFFFF
+
+
+def test_recorded_data_packets():
+    reader = CaptureReader(RECORDED_FRAMES)
+    packets = [bytes(datagram) for datagram, _ in reader if len(datagram) != HEADER_SIZE]
+    reader.close()
+    assert len(packets) == 3
+    for data in packets:
+        nr_of_targets = (len(data) - DATA_PACKET_PREFIX) // TARGET_SIZE
+        assert calculate_checksum(data, nr_of_targets, TARGET_SIZE) == _calculate_checksum_loop(data, nr_of_targets, TARGET_SIZE)
+
+
+def test_recorded_frames_match_header_checksum():
+    reader = CaptureReader(RECORDED_FRAMES)
+    datagrams = [(bytes(datagram), received_at) for datagram, received_at in reader]
+    reader.close()
+    headers = [parse_header(datagram) for datagram, _ in datagrams if len(datagram) == HEADER_SIZE]
+
+    assembler = FrameAssembler()
+    frames = [frame for datagram, received_at in datagrams for frame in assembler.add_datagram(datagram, received_at)]
+    assert [frame.frame_id for frame in frames] == [header[5] for header in headers]
+    for frame, header in zip(frames, headers):
+        checksum = calculate_checksum(frame.data, frame.nr_of_targets, frame.bytes_per_target)
+        assert checksum == header[3]
+        assert checksum == _calculate_checksum_loop(frame.data, frame.nr_of_targets, frame.bytes_per_target)
+    assert assembler.get_stats()['checksum_failures'] == 0
@@ -0,0 +1,57 @@
+import json
+import signal
+import pytest
+from detection_log import DetectionRecorder
+
+
+class Record:
+    """Stands in for a TargetRecord, only to_dict() is written"""
+
+    def __init__(self, target_id, on_to_dict=None):
+        self.target_id = target_id
+        self.on_to_dict = on_to_dict
+
+    def to_dict(self):
+        if self.on_to_dict is not None:
+            on_to_dict, self.on_to_dict = self.on_to_dict, None
+            on_to_dict()
+        return {'target_id': self.target_id}
+
+
+def read_ids(filename):
+    with open(filename) as file:
+        return [json.loads(line)['target_id'] for line in file]
+
+
+def test_record_and_close(tmp_path):
+    filename = tmp_path / "detections.ndjson"
+    recorder = DetectionRecorder(str(filename), flush_size=3, flush_interval=None)
+    recorder.record([Record(1), Record(2)])
+    recorder.record([Record(3), Record(4)])
+    assert read_ids(filename) == [1, 2, 3, 4]
+    recorder.record([Record(5)])
+    recorder.close()
+    recorder.close()
+    assert read_ids(filename) == [1, 2, 3, 4, 5]
+    with pytest.raises(ValueError):
+        recorder.record([Record(6)])
+
+
+def test_close_from_signal_handler_during_record(tmp_path):
+    # main.py's SIGINT handler closes the recorder on the thread that may be inside record()
+    filename = tmp_path / "detections.ndjson"
+    recorder = DetectionRecorder(str(filename), flush_size=2, flush_interval=10.0)
+
+    def handler(sig, frame):
+        recorder.close()
+        raise SystemExit(0)
+
+    previous = signal.signal(signal.SIGINT, handler)
+    try:
+        with pytest.raises(SystemExit):
+            recorder.record([Record(1), Record(2, on_to_dict=lambda: signal.raise_signal(signal.SIGINT))])
+    finally:
+        signal.signal(signal.SIGINT, previous)
+
+    assert recorder.closed
+    assert read_ids(filename) == [1, 2]
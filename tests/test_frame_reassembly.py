@@ -0,0 +1,50 @@
+import os
+import pytest
+from radar_capture import CaptureReader
+from radar_decoder import HEADER_SIZE
+from frame_reassembly import FrameAssembler
+
+# Two frames (1 and 2 data packets) recorded with CAPTURE_FILE
+RECORDED_FRAMES = os.path.join(os.path.dirname(__file__), "data", "frames.cap")
+
+
+@pytest.fixture(scope="module")
+def two_packet_frame():
+    """Header and the two data packets of the second recorded frame, with its receive time"""
+    reader = CaptureReader(RECORDED_FRAMES)
+    datagrams = [(bytes(datagram), received_at) for datagram, received_at in reader]
+    reader.close()
+    assert len(datagrams) == 5 and len(datagrams[2][0]) == HEADER_SIZE
+    return [datagram for datagram, _ in datagrams[2:]], datagrams[2][1]
+
+
+@pytest.mark.parametrize("order, reordered", [
+    ((0, 1, 2), 0),
+    ((1, 2, 0), 1),  # data packets before their header
+    ((0, 2, 1), 1),  # data packets swapped
+    ((2, 0, 1), 1),
+    ((2, 1, 0), 1),
+])
+def test_reordered_frame_counted_once(two_packet_frame, order, reordered):
+    datagrams, received_at = two_packet_frame
+    assembler = FrameAssembler()
+    frames = [frame for index in order for frame in assembler.add_datagram(datagrams[index], received_at)]
+
+    assert len(frames) == 1
+    stats = assembler.get_stats()
+    assert stats['frames_reordered'] == reordered
+    assert stats['packets_duplicate'] == stats['packets_invalid'] == stats['checksum_failures'] == 0
+
+
+def test_duplicate_and_late_packets(two_packet_frame):
+    datagrams, received_at = two_packet_frame
+    assembler = FrameAssembler()
+    for datagram in (datagrams[0], datagrams[1], datagrams[1]):
+        assert assembler.add_datagram(datagram, received_at) == []
+    assert len(assembler.add_datagram(datagrams[2], received_at)) == 1
+    assert assembler.add_datagram(datagrams[2], received_at) == []
+
+    stats = assembler.get_stats()
+    assert stats['frames_reordered'] == 0
+    assert stats['packets_duplicate'] == 1
+    assert stats['packets_late'] == 1
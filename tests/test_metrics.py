@@ -0,0 +1,34 @@
+from radar_metrics import MetricsRegistry
+
+
+def test_registering_again_replaces_the_metric():
+    registry = MetricsRegistry()
+    first_counter = registry.counter("frames_total", radar="1")
+    first_histogram = registry.histogram("frame_seconds", radar="1")
+    registry.gauge("tracks", lambda: 3, radar="1")
+    first_counter.inc(5)
+    first_histogram.record(0.01)
+
+    # The same metrics of a component created again for the same radar
+    second_counter = registry.counter("frames_total", radar="1")
+    registry.histogram("frame_seconds", radar="1")
+    registry.gauge("tracks", lambda: 7, radar="1")
+    second_counter.inc()
+
+    metrics = registry.get_metrics()
+    assert metrics['frames_total{radar="1"}'] == 1
+    assert metrics['frame_seconds{radar="1"}']['count'] == 0
+    assert metrics['tracks{radar="1"}'] == 7
+
+
+def test_labels_keep_series_apart():
+    registry = MetricsRegistry()
+    registry.counter("frames_total", radar="1").inc()
+    registry.counter("frames_total", radar="2").inc(2)
+    registry.gauge("tracks", lambda: 1, radar="1")
+    registry.gauge("tracks", lambda: 2, radar="2")
+
+    text = registry.render_prometheus()
+    assert text.count("# TYPE frames_total counter") == 1
+    assert 'frames_total{radar="1"} 1.0' in text and 'frames_total{radar="2"} 2.0' in text
+    assert 'tracks{radar="1"} 1.0' in text and 'tracks{radar="2"} 2.0' in text
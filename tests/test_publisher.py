@@ -0,0 +1,88 @@
+import time
+import pytest
+from radar_publisher import (COLUMNAR_ENCODING, FRAME_MODE, JSON_ENCODING, MSGPACK_ENCODING, TARGET_MODE,
+                             FramePublisher, decode_message, msgpack)
+
+
+class Target:
+    """Stands in for a TrackedTarget, only to_dict() is published"""
+
+    def __init__(self, **state):
+        self.state = state
+
+    def to_dict(self):
+        return dict(self.state)
+
+
+def target(track_id, frame_id=5, timestamp=1.0, **optional):
+    return Target(radar_id="radar-1", area_id="area-1", frame_id=frame_id, timestamp=timestamp,
+                  track_id=track_id, x=1.5 * track_id, y=-2.0, speed=0.0, classification="person", **optional)
+
+
+def frames():
+    return [
+        # Same number of keys in the first two targets: optional keys in one, stale frame keys in the other
+        [
+            target(1, predicted_x=3.0, predicted_y=4.0),
+            target(2, frame_id=4, timestamp=0.5),
+            target(3, predicted_x=-1.0, predicted_y=0.0, time_to_closest_approach=2.5),
+            target(4),
+        ],
+        [target(1, frame_id=6, timestamp=1.05), target(5, frame_id=2, timestamp=0.1, predicted_x=0.0, predicted_y=0.0)],
+    ]
+
+
+ENCODINGS = [
+    JSON_ENCODING,
+    COLUMNAR_ENCODING,
+    pytest.param(MSGPACK_ENCODING, marks=pytest.mark.skipif(msgpack is None, reason="msgpack not installed")),
+]
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+@pytest.mark.parametrize("batch_window", [0, 60])
+def test_round_trip(encoding, batch_window):
+    messages = []
+    publisher = FramePublisher(lambda payload, qos: messages.append(payload), FRAME_MODE, encoding, batch_window=batch_window)
+    for frame in frames():
+        publisher.publish_frame(frame)
+    publisher.close()
+
+    assert len(messages) == (2 if batch_window == 0 else 1)
+    decoded = [target for payload in messages for target in decode_message(payload, FRAME_MODE, encoding)]
+    assert decoded == [target.to_dict() for frame in frames() for target in frame]
+    assert publisher.get_stats()['targets_published'] == len(decoded)
+
+
+def test_target_mode():
+    messages = []
+    publisher = FramePublisher(lambda payload, qos: messages.append(payload), TARGET_MODE)
+    for frame in frames():
+        publisher.publish_frame(frame)
+    publisher.close()
+
+    decoded = [target for payload in messages for target in decode_message(payload, TARGET_MODE)]
+    assert decoded == [target.to_dict() for frame in frames() for target in frame]
+
+
+def test_window_sent_without_further_frames():
+    messages = []
+    publisher = FramePublisher(lambda payload, qos: messages.append(payload), FRAME_MODE, JSON_ENCODING, batch_window=0.05)
+    publisher.publish_frame(frames()[0])
+    deadline = time.monotonic() + 2
+    while not messages and time.monotonic() < deadline:
+        time.sleep(0.01)
+    publisher.close()
+    assert len(messages) == 1
+
+
+def test_window_ended_by_empty_frame():
+    messages = []
+    publisher = FramePublisher(lambda payload, qos: messages.append(payload), FRAME_MODE, JSON_ENCODING, batch_window=0.05)
+    publisher.publish_frame(frames()[0])
+    time.sleep(0.06)
+    # The empty frame sends the window even if the timer has not yet
+    publisher.publish_frame([])
+    assert len(messages) == 1
+    publisher.close()
+    assert len(messages) == 1
@@ -0,0 +1,156 @@
+import socket
+import struct
+import sys
+import time
+from radar_capture import CaptureWriter
+from config import *
+
+# Largest datagram accepted into a ring slot; anything bigger is flagged as truncated
+SLOT_SIZE = 2048
+
+# Linux: kernel adds the socket's cumulative drop counter to every received message
+SO_RXQ_OVFL = getattr(socket, "SO_RXQ_OVFL", 40 if sys.platform.startswith("linux") else None)
+
+
+class DatagramReceiver:
+    def __init__(self, local_ip=LOCAL_IP, local_port=LOCAL_PORT, receive_buffer_size=SOCKET_RECEIVE_BUFFER,
+                 batch_size=RECEIVE_BATCH_SIZE, ring_size=RECEIVE_RING_SIZE, capture_file=CAPTURE_FILE):
+        """
+        UDP receiver that reads datagrams in batches into a preallocated ring of buffers
+
+        Args:
+            local_ip, local_port: Address to bind to
+            receive_buffer_size: Requested kernel socket receive buffer (SO_RCVBUF) in bytes
+            batch_size: Maximum number of datagrams returned by one receive_batch call
+            ring_size: Number of buffer slots; a returned datagram stays valid
+                until ring_size more datagrams have been received
+            capture_file: Also write every datagram with its receive time to this capture file (None disables)
+        """
+        if ring_size < batch_size:
+            raise ValueError("ring_size must be at least batch_size")
+
+        self.local_ip = local_ip
+        self.local_port = local_port
+        self.receive_buffer_size = receive_buffer_size
+        self.batch_size = batch_size
+        self.ring_size = ring_size
+        self.capture_file = capture_file
+        self.capture = None
+        self.finished = False  # Live sockets never run out of datagrams, see CaptureReceiver
+
+        self.ring = bytearray(ring_size * SLOT_SIZE)
+        ring_view = memoryview(self.ring)
+        self.slots = [ring_view[i * SLOT_SIZE:(i + 1) * SLOT_SIZE] for i in range(ring_size)]
+        self.next_slot = 0
+
+        self.sock = None
+        self.ancillary_size = socket.CMSG_SPACE(4) if SO_RXQ_OVFL is not None else 0
+        self.effective_receive_buffer_size = None
+
+        self.datagrams_received = 0
+        self.bytes_received = 0
+        self.batches = 0
+        self.datagrams_truncated = 0
+        self.kernel_drops = 0  # cumulative, as reported by SO_RXQ_OVFL (None if unsupported)
+
+    def open(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer_size)
+        self.effective_receive_buffer_size = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        if self.effective_receive_buffer_size < self.receive_buffer_size:
+            # Linux caps SO_RCVBUF at net.core.rmem_max (and reports twice the usable size)
+            print(f"Warning: socket receive buffer is {self.effective_receive_buffer_size} bytes, "
+                  f"requested {self.receive_buffer_size}. Raise net.core.rmem_max to allow more.")
+
+        if SO_RXQ_OVFL is not None:
+            try:
+                self.sock.setsockopt(socket.SOL_SOCKET, SO_RXQ_OVFL, 1)
+            except OSError:
+                self.ancillary_size = 0
+        if not self.ancillary_size:
+            self.kernel_drops = None
+
+        self.sock.bind((self.local_ip, self.local_port))
+        if self.capture_file:
+            self.capture = CaptureWriter(self.capture_file)
+        return self
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        if self.capture is not None:
+            self.capture.close()
+            print(f"Capture saved to {self.capture.filename} ({self.capture.datagrams_written} datagrams)")
+            self.capture = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def receive_batch(self, timeout=None):
+        """
+        Wait for at least one datagram, then drain what is already queued
+
+        Args:
+            timeout: Seconds to wait for the first datagram (None waits forever)
+
+        Returns:
+            List of (memoryview, received_at) tuples. The views point into the
+            ring and are overwritten once the ring wraps around, copy them if
+            they must outlive that.
+        """
+        self.sock.settimeout(timeout)
+        batch = []
+
+        while len(batch) < self.batch_size:
+            slot = self.slots[self.next_slot]
+            try:
+                nbytes, ancdata, msg_flags, addr = self.sock.recvmsg_into([slot], self.ancillary_size)
+            except (BlockingIOError, socket.timeout):
+                break
+
+            received_at = time.time()
+            self.next_slot = (self.next_slot + 1) % self.ring_size
+
+            if msg_flags & socket.MSG_TRUNC:
+                self.datagrams_truncated += 1
+                continue
+
+            batch.append((slot[:nbytes], received_at))
+            if self.capture is not None:
+                self.capture.write(slot[:nbytes], received_at)
+            self.datagrams_received += 1
+            self.bytes_received += nbytes
+            self._update_kernel_drops(ancdata)
+
+            # Everything after the first datagram is only taken if already queued.
+            # MSG_DONTWAIT is not enough, with a timeout set Python waits for the socket before reading
+            self.sock.settimeout(0)
+
+        if batch:
+            self.batches += 1
+        return batch
+
+    def _update_kernel_drops(self, ancdata):
+        for level, kind, data in ancdata:
+            if level == socket.SOL_SOCKET and kind == SO_RXQ_OVFL:
+                drops = struct.unpack('=I', data[:4])[0]
+                if drops > self.kernel_drops:
+                    print(f"Warning: kernel dropped {drops - self.kernel_drops} datagrams, processing is falling behind")
+                    self.kernel_drops = drops
+
+    def get_stats(self):
+        """Counters as dict"""
+        return {
+            'datagrams_received': self.datagrams_received,
+            'bytes_received': self.bytes_received,
+            'batches': self.batches,
+            'avg_batch_size': round(self.datagrams_received / self.batches, 2) if self.batches else 0,
+            'datagrams_truncated': self.datagrams_truncated,
+            'kernel_drops': self.kernel_drops,
+            'receive_buffer_size': self.effective_receive_buffer_size,
+            'capture': self.capture.get_stats() if self.capture is not None else None,
+        }